@@ -1,161 +1,185 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from database import get_all_users, get_all_images, get_image_data
-from image_processor import convert_image_to_base64
-import io
-from PIL import Image
+from database import CONFIDENCE_HISTOGRAM_BINS
+from database_cached import (
+    cached_fetch_dashboard_bundle, cached_user_management_data, cached_image_analysis_data,
+    cached_system_statistics_data, cached_query_users, cached_query_images, load_decoded_image
+)
+
+IMAGE_PAGE_SIZE = 50
+USER_PAGE_SIZE = 50
+
+USER_COLUMNS = ['ID', 'Username', 'Email', 'Role', 'Created At']
+IMAGE_COLUMNS = [
+    'ID', 'Username', 'Filename', 'Upload Date', 'Image Type',
+    'Prediction', 'Confidence Score', 'Analysis Date'
+]
+
+def _build_users_df(users):
+    """Build the typed users DataFrame shared by the admin tabs"""
+    df_users = pd.DataFrame(users, columns=USER_COLUMNS)
+    df_users['Created At'] = pd.to_datetime(df_users['Created At'])
+    df_users['Role'] = df_users['Role'].astype('category')
+    return df_users
+
+def _build_images_df(images):
+    """Build the typed images DataFrame shared by the admin tabs"""
+    df_images = pd.DataFrame(images, columns=IMAGE_COLUMNS)
+    df_images['Upload Date'] = pd.to_datetime(df_images['Upload Date'])
+    df_images['Analysis Date'] = pd.to_datetime(df_images['Analysis Date'])
+    # Low-cardinality text columns are stored as codes plus a small lookup
+    for column in ('Prediction', 'Image Type', 'Username'):
+        df_images[column] = df_images[column].astype('category')
+    return df_images
 
 def show_admin_dashboard():
     """Display admin dashboard"""
     st.header("🔧 Administrator Dashboard")
     
-    # Create tabs for different admin functions
-    tab1, tab2, tab3, tab4 = st.tabs(["Overview", "User Management", "Image Analysis", "System Statistics"])
-    
-    with tab1:
-        show_overview_dashboard()
-    
-    with tab2:
-        show_user_management()
-    
-    with tab3:
-        show_image_analysis()
-    
-    with tab4:
-        show_system_statistics()
+    # Only the selected section is rendered; st.tabs would run every tab body
+    section = st.radio(
+        "Section",
+        ["Overview", "User Management", "Image Analysis", "System Statistics"],
+        horizontal=True,
+        key="admin_section",
+        label_visibility="collapsed"
+    )
+    
+    # Each section fetches only the data it renders
+    if section == "Overview":
+        bundle = cached_fetch_dashboard_bundle()
+        show_overview_dashboard(bundle.metrics, bundle.recent_images)
+    elif section == "User Management":
+        show_user_management(*cached_user_management_data())
+    elif section == "Image Analysis":
+        show_image_analysis(*cached_image_analysis_data())
+    else:
+        show_system_statistics(*cached_system_statistics_data())
 
-def show_overview_dashboard():
+def show_overview_dashboard(metrics, images):
     """Show overview dashboard with key metrics"""
     st.subheader("System Overview")
     
-    # Get data
-    users = get_all_users()
-    images = get_all_images()
-    
-    # Calculate metrics
-    total_users = len(users)
-    total_images = len(images)
-    
-    # Filter for recent activity (last 30 days)
-    recent_date = datetime.now() - timedelta(days=30)
-    recent_users = [u for u in users if u[4] and u[4] > recent_date]  # created_at
-    recent_images = [i for i in images if i[3] and i[3] > recent_date]  # upload_date
-    
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Users", total_users, len(recent_users))
+        st.metric("Total Users", metrics['total_users'], metrics['recent_users'])
     
     with col2:
-        st.metric("Total Images", total_images, len(recent_images))
+        st.metric("Total Images", metrics['total_images'], metrics['recent_images'])
     
     with col3:
-        cancer_detected = len([i for i in images if i[5] and 'Cancer' in str(i[5])])
-        st.metric("Cancer Cases Detected", cancer_detected)
+        st.metric("Cancer Cases Detected", metrics['cancer_detected'])
     
     with col4:
-        avg_confidence = 0
-        confidence_scores = [i[6] for i in images if i[6] is not None]
-        if confidence_scores:
-            avg_confidence = sum(confidence_scores) / len(confidence_scores)
-        st.metric("Avg Confidence", f"{avg_confidence:.1%}")
+        st.metric("Avg Confidence", f"{metrics['avg_confidence']:.1%}")
     
     # Recent activity
     st.subheader("Recent Activity")
     
     if images:
         # Convert to DataFrame for easier manipulation
-        df_images = pd.DataFrame(images)
-        if not df_images.empty:
-            df_images.columns = [
+        recent_uploads = pd.DataFrame(images)
+        if not recent_uploads.empty:
+            recent_uploads.columns = [
                 'id', 'username', 'filename', 'upload_date', 'image_type',
                 'prediction', 'confidence_score', 'analysis_date'
             ]
         
         # Show recent uploads
-        recent_uploads = df_images.head(10)
         st.dataframe(recent_uploads[['username', 'filename', 'upload_date', 'prediction', 'confidence_score']])
     else:
         st.info("No images uploaded yet.")
 
-def show_user_management():
+def _reset_user_page():
+    """Return the user table to its first page"""
+    st.session_state.user_page = 0
+
+def show_user_management(role_counts, signup_dates):
     """Show user management interface"""
     st.subheader("User Management")
     
-    users = get_all_users()
-    
-    if users:
-        # Convert to DataFrame
-        df_users = pd.DataFrame(users)
-        if not df_users.empty:
-            df_users.columns = ['ID', 'Username', 'Email', 'Role', 'Created At']
-        
+    if role_counts:
         # User statistics
         col1, col2 = st.columns(2)
         with col1:
             st.write("**User Roles Distribution**")
-            role_counts = df_users['Role'].value_counts()
-            fig_pie = px.pie(values=role_counts.values, names=role_counts.index, title="User Roles")
+            roles = [row[0] for row in role_counts]
+            counts = [row[1] for row in role_counts]
+            fig_pie = px.pie(values=counts, names=roles, title="User Roles")
             st.plotly_chart(fig_pie, use_container_width=True)
         
         with col2:
             st.write("**User Registration Timeline**")
-            df_users['Created At'] = pd.to_datetime(df_users['Created At'])
-            df_users['Date'] = df_users['Created At'].dt.date
-            registrations = df_users.groupby('Date').size().reset_index().rename(columns={0: 'Count'})
-            fig_line = px.line(registrations, x='Date', y='Count', title="Daily Registrations")
+            signup_days = [row[0] for row in signup_dates]
+            signup_counts = [row[1] for row in signup_dates]
+            fig_line = px.line(x=signup_days, y=signup_counts, title="Daily Registrations",
+                               labels={'x': 'Date', 'y': 'Count'})
             st.plotly_chart(fig_line, use_container_width=True)
         
         # User table with search
         st.write("**All Users**")
-        search_term = st.text_input("Search users by username or email:")
         
-        if search_term:
-            filtered_users = df_users[
-                df_users['Username'].str.contains(search_term, case=False) |
-                df_users['Email'].str.contains(search_term, case=False)
-            ]
-        else:
-            filtered_users = df_users
+        if 'user_page' not in st.session_state:
+            st.session_state.user_page = 0
+        
+        search_term = st.text_input("Search users by username or email:", on_change=_reset_user_page)
+        
+        # Search and paginate in the database
+        page_users, total_rows = cached_query_users(
+            term=search_term or None,
+            offset=st.session_state.user_page * USER_PAGE_SIZE,
+            limit=USER_PAGE_SIZE
+        )
+        st.dataframe(_build_users_df(page_users), use_container_width=True)
         
-        st.dataframe(filtered_users, use_container_width=True)
+        page_count = max(1, -(-total_rows // USER_PAGE_SIZE))
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Prev", key="user_prev", disabled=st.session_state.user_page == 0):
+                st.session_state.user_page -= 1
+                st.rerun()
+        with col2:
+            st.write(f"Page {st.session_state.user_page + 1} of {page_count} ({total_rows} users)")
+        with col3:
+            if st.button("Next ▶", key="user_next", disabled=st.session_state.user_page + 1 >= page_count):
+                st.session_state.user_page += 1
+                st.rerun()
     else:
         st.info("No users found in the system.")
 
-def show_image_analysis():
+def _reset_image_page():
+    """Return the image table to its first page"""
+    st.session_state.image_page = 0
+
+def show_image_analysis(prediction_counts, confidence_histogram, uploader_names):
     """Show image analysis interface"""
     st.subheader("Image Analysis Overview")
     
-    images = get_all_images()
-    
-    if images:
-        # Convert to DataFrame
-        df_images = pd.DataFrame(images)
-        if not df_images.empty:
-            df_images.columns = [
-                'ID', 'Username', 'Filename', 'Upload Date', 'Image Type',
-                'Prediction', 'Confidence Score', 'Analysis Date'
-            ]
-        
+    # Every image belongs to a user, so no uploaders means no images
+    if uploader_names:
         # Analysis statistics
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Prediction Distribution**")
-            prediction_counts = df_images['Prediction'].value_counts()
-            fig_bar = px.bar(x=prediction_counts.index, y=prediction_counts.values, 
+            # Counts and bins arrive pre-aggregated from the database
+            predictions = [row[0] for row in prediction_counts]
+            counts = [row[1] for row in prediction_counts]
+            fig_bar = px.bar(x=predictions, y=counts, 
                            title="Prediction Results")
             st.plotly_chart(fig_bar, use_container_width=True)
         
         with col2:
             st.write("**Confidence Score Distribution**")
-            valid_scores = df_images['Confidence Score'].dropna()
-            if not valid_scores.empty:
-                fig_hist = px.histogram(valid_scores, nbins=20, title="Confidence Scores")
+            if confidence_histogram:
+                bin_centers = [(row[0] - 0.5) / CONFIDENCE_HISTOGRAM_BINS for row in confidence_histogram]
+                bin_counts = [row[1] for row in confidence_histogram]
+                fig_hist = px.bar(x=bin_centers, y=bin_counts, title="Confidence Scores",
+                                  labels={'x': 'Confidence Score', 'y': 'Count'})
+                fig_hist.update_layout(bargap=0)
                 st.plotly_chart(fig_hist, use_container_width=True)
             else:
                 st.info("No confidence scores available")
@@ -163,125 +187,132 @@ def show_image_analysis():
         # Detailed image table
         st.write("**All Analyzed Images**")
         
-        # Filter options
+        if 'image_page' not in st.session_state:
+            st.session_state.image_page = 0
+        
+        # Filter options (changing a filter returns to the first page)
         col1, col2, col3 = st.columns(3)
         with col1:
-            user_filter = st.selectbox("Filter by User", ["All"] + list(df_images['Username'].unique()))
+            user_filter = st.selectbox("Filter by User", ["All"] + uploader_names,
+                                       on_change=_reset_image_page)
         with col2:
-            prediction_filter = st.selectbox("Filter by Prediction", ["All"] + list(df_images['Prediction'].dropna().unique()))
+            prediction_filter = st.selectbox("Filter by Prediction", ["All"] + [row[0] for row in prediction_counts],
+                                             on_change=_reset_image_page)
         with col3:
-            min_confidence = st.slider("Minimum Confidence", 0.0, 1.0, 0.0)
+            min_confidence = st.slider("Minimum Confidence", 0.0, 1.0, 0.0, on_change=_reset_image_page)
         
-        # Apply filters
-        filtered_df = df_images.copy()
-        if user_filter != "All":
-            filtered_df = filtered_df[filtered_df['Username'] == user_filter]
-        if prediction_filter != "All":
-            filtered_df = filtered_df[filtered_df['Prediction'] == prediction_filter]
-        if min_confidence > 0:
-            filtered_df = filtered_df[filtered_df['Confidence Score'] >= min_confidence]
+        # Filter, sort and paginate in the database
+        page_images, total_rows = cached_query_images(
+            user=None if user_filter == "All" else user_filter,
+            prediction=None if prediction_filter == "All" else prediction_filter,
+            min_conf=min_confidence,
+            offset=st.session_state.image_page * IMAGE_PAGE_SIZE,
+            limit=IMAGE_PAGE_SIZE
+        )
+        filtered_df = _build_images_df(page_images)
+        filtered_df_indexed = filtered_df.set_index('ID', drop=False)
         
-        # Display filtered results
+        # Display the current page of filtered results
         st.dataframe(filtered_df, use_container_width=True)
         
+        page_count = max(1, -(-total_rows // IMAGE_PAGE_SIZE))
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Prev", disabled=st.session_state.image_page == 0):
+                st.session_state.image_page -= 1
+                st.rerun()
+        with col2:
+            st.write(f"Page {st.session_state.image_page + 1} of {page_count} ({total_rows} images)")
+        with col3:
+            if st.button("Next ▶", disabled=st.session_state.image_page + 1 >= page_count):
+                st.session_state.image_page += 1
+                st.rerun()
+        
         # Image viewer
         st.write("**Image Viewer**")
         if len(filtered_df) > 0:
             selected_image_id = st.selectbox("Select Image to View", filtered_df['ID'].tolist())
             
             if st.button("Load Image"):
-                image_data = get_image_data(selected_image_id)
-                if image_data:
-                    image_bytes, filename, image_type = image_data
+                decoded_image = None
+                try:
+                    # Repeat views are served from the decoded-image cache
+                    decoded_image = load_decoded_image(selected_image_id)
+                    if decoded_image is None:
+                        st.error("Image not found or could not be loaded")
+                except Exception as e:
+                    st.error(f"Error loading image: {e}")
+                
+                if decoded_image:
+                    image, filename, image_type, dimensions = decoded_image
                     
                     # Display image
-                    try:
-                        image = Image.open(io.BytesIO(image_bytes))
-                        st.image(image, caption=f"Image: {filename}", use_column_width=True)
-                        
-                        # Show image details
-                        mask = filtered_df['ID'] == selected_image_id
-                        matching_rows = filtered_df[mask]
-                        if len(matching_rows) > 0:
-                            selected_row = matching_rows.iloc[0]
-                            st.write("**Image Details:**")
-                            st.write(f"- **User:** {selected_row['Username']}")
-                            st.write(f"- **Filename:** {selected_row['Filename']}")
-                            st.write(f"- **Upload Date:** {selected_row['Upload Date']}")
-                            st.write(f"- **Prediction:** {selected_row['Prediction']}")
-                            st.write(f"- **Confidence:** {selected_row['Confidence Score']:.2%}" if pd.notna(selected_row['Confidence Score']) else "- **Confidence:** N/A")
-                        else:
-                            st.error("Selected image not found in filtered results")
-                        
-                    except Exception as e:
-                        st.error(f"Error loading image: {e}")
-                else:
-                    st.error("Image not found or could not be loaded")
+                    st.image(image, caption=f"Image: {filename}", use_column_width=True)
+                    
+                    # Show image details
+                    if selected_image_id in filtered_df_indexed.index:
+                        selected_row = filtered_df_indexed.loc[selected_image_id]
+                        st.write("**Image Details:**")
+                        st.write(f"- **User:** {selected_row['Username']}")
+                        st.write(f"- **Filename:** {selected_row['Filename']}")
+                        st.write(f"- **Dimensions:** {dimensions[0]} x {dimensions[1]}")
+                        st.write(f"- **Upload Date:** {selected_row['Upload Date']}")
+                        st.write(f"- **Prediction:** {selected_row['Prediction']}")
+                        st.write(f"- **Confidence:** {selected_row['Confidence Score']:.2%}" if pd.notna(selected_row['Confidence Score']) else "- **Confidence:** N/A")
+                    else:
+                        st.error("Selected image not found in filtered results")
     else:
         st.info("No images found in the system.")
 
-def show_system_statistics():
+def show_system_statistics(stats, confidence_by_prediction, daily_uploads, top_uploaders):
     """Show system statistics and analytics"""
     st.subheader("System Statistics")
     
-    users = get_all_users()
-    images = get_all_images()
-    
-    if not images:
+    if stats['total_images'] == 0:
         st.info("No data available for statistics.")
         return
     
-    # Convert to DataFrame
-    df_images = pd.DataFrame(images)
-    if not df_images.empty:
-        df_images.columns = [
-            'ID', 'Username', 'Filename', 'Upload Date', 'Image Type',
-            'Prediction', 'Confidence Score', 'Analysis Date'
-        ]
-    
     # Time-based analysis
     st.write("**Upload Activity Over Time**")
-    df_images['Upload Date'] = pd.to_datetime(df_images['Upload Date'])
-    df_images['Date'] = df_images['Upload Date'].dt.date
-    
-    daily_uploads = df_images.groupby('Date').size().reset_index().rename(columns={0: 'Uploads'})
-    fig_timeline = px.line(daily_uploads, x='Date', y='Uploads', title="Daily Upload Activity")
+    upload_days = [row[0] for row in daily_uploads]
+    upload_counts = [row[1] for row in daily_uploads]
+    fig_timeline = px.line(x=upload_days, y=upload_counts, title="Daily Upload Activity",
+                           labels={'x': 'Date', 'y': 'Uploads'})
     st.plotly_chart(fig_timeline, use_container_width=True)
     
     # User activity analysis
     st.write("**User Activity Analysis**")
-    user_activity = df_images.groupby('Username').size().reset_index().rename(columns={0: 'Images Uploaded'})
-    user_activity = user_activity.sort_values(by='Images Uploaded', ascending=False)
+    top_users = pd.DataFrame(top_uploaders, columns=['Username', 'Images Uploaded'])
     
     col1, col2 = st.columns(2)
     with col1:
         st.write("**Top Active Users**")
-        st.dataframe(user_activity.head(10))
+        st.dataframe(top_users)
     
     with col2:
         st.write("**User Activity Distribution**")
-        fig_user_activity = px.bar(user_activity.head(10), x='Username', y='Images Uploaded')
+        fig_user_activity = px.bar(top_users, x='Username', y='Images Uploaded')
         st.plotly_chart(fig_user_activity, use_container_width=True)
     
     # Confidence score analysis
     st.write("**Model Performance Analysis**")
-    valid_scores = df_images['Confidence Score'].dropna()
-    
-    if not valid_scores.empty:
+    # Confidence aggregates are computed in the database
+    if stats['mean_confidence'] is not None:
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Confidence Score Statistics**")
-            st.write(f"- **Mean Confidence:** {valid_scores.mean():.2%}")
-            st.write(f"- **Median Confidence:** {valid_scores.median():.2%}")
-            st.write(f"- **Standard Deviation:** {valid_scores.std():.2%}")
-            st.write(f"- **High Confidence (>80%):** {(valid_scores > 0.8).sum()} images")
-            st.write(f"- **Low Confidence (<60%):** {(valid_scores < 0.6).sum()} images")
+            st.write(f"- **Mean Confidence:** {stats['mean_confidence']:.2%}")
+            st.write(f"- **Median Confidence:** {stats['median_confidence']:.2%}")
+            std_confidence = stats['std_confidence']
+            st.write(f"- **Standard Deviation:** {std_confidence:.2%}" if std_confidence is not None else "- **Standard Deviation:** N/A")
+            st.write(f"- **High Confidence (>80%):** {stats['high_confidence']} images")
+            st.write(f"- **Low Confidence (<60%):** {stats['low_confidence']} images")
         
         with col2:
             st.write("**Confidence by Prediction Type**")
-            confidence_by_prediction = df_images.groupby('Prediction')['Confidence Score'].agg(['mean', 'count']).round(3)
-            st.dataframe(confidence_by_prediction)
+            confidence_df = pd.DataFrame(confidence_by_prediction, columns=['Prediction', 'mean', 'count'])
+            st.dataframe(confidence_df.set_index('Prediction').round(3))
     
     # System health indicators
     st.write("**System Health Indicators**")
@@ -289,14 +320,12 @@ def show_system_statistics():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_analyses = len(df_images[df_images['Prediction'].notna()])
-        success_rate = (total_analyses / len(df_images)) * 100 if len(df_images) > 0 else 0
+        success_rate = stats['analyzed_images'] / stats['total_images'] * 100
         st.metric("Analysis Success Rate", f"{success_rate:.1f}%")
     
     with col2:
-        avg_confidence = valid_scores.mean() if not valid_scores.empty else 0
+        avg_confidence = stats['mean_confidence'] or 0
         st.metric("Average Model Confidence", f"{avg_confidence:.1%}")
     
     with col3:
-        active_users = len(df_images['Username'].unique())
-        st.metric("Active Users", active_users)
+        st.metric("Active Users", stats['active_users'])
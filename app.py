@@ -1,9 +1,8 @@
 import streamlit as st
 import os
-from auth import authenticate_user, create_user, get_user_role
-from admin_dashboard import show_admin_dashboard
-from user_interface import show_user_interface
-from database import init_database
+from auth import authenticate_user, create_user, get_user_role, BCRYPT_MAX_PASSWORD_BYTES
+from database import init_database, DatabaseUnavailableError
+from database_cached import invalidate_admin_cache
 
 # Page configuration
 st.set_page_config(
@@ -36,9 +35,13 @@ def main():
         show_login_page()
     else:
         # Show appropriate interface based on user role
+        # Dashboards are imported on first use so the login page does not
+        # pay for plotly, OpenCV and the model load
         if st.session_state.user_role == 'admin':
+            from admin_dashboard import show_admin_dashboard
             show_admin_dashboard()
         else:
+            from user_interface import show_user_interface
             show_user_interface()
 
 def show_login_page():
@@ -81,9 +84,12 @@ def show_login_page():
                         st.error("Passwords do not match")
                     elif len(new_password) < 6:
                         st.error("Password must be at least 6 characters long")
+                    elif len(new_password.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+                        st.error(f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes long")
                     else:
                         success = create_user(new_username, new_email, new_password, role)
                         if success:
+                            invalidate_admin_cache()
                             st.success("Registration successful! Please login.")
                         else:
                             st.error("Registration failed. Username or email may already exist.")
@@ -101,4 +107,9 @@ def show_login_page():
                 st.rerun()
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DatabaseUnavailableError as e:
+        # Raised instead of returning empty results, so nothing stale is cached
+        print(e)
+        st.error("The database is busy or unavailable. Please try again in a moment.")
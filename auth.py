@@ -1,97 +1,107 @@
 import hashlib
+import hmac
+import bcrypt
 import psycopg2
-from database import get_db_connection
+from database import get_db_connection, execute_prepared
+
+BCRYPT_ROUNDS = 10
+
+# bcrypt only accepts passwords up to 72 bytes; bcrypt 5 raises beyond that
+BCRYPT_MAX_PASSWORD_BYTES = 72
 
 def hash_password(password):
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password using bcrypt with a per-user salt"""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+def verify_password(password, password_hash):
+    """Verify password against a stored bcrypt (or legacy SHA256) hash"""
+    if password_hash.startswith('$2'):
+        password_bytes = password.encode()
+        if len(password_bytes) > BCRYPT_MAX_PASSWORD_BYTES:
+            return False
+        return bcrypt.checkpw(password_bytes, password_hash.encode())
+    # Accounts created before the switch to bcrypt store an unsalted SHA256 digest
+    legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy_hash, password_hash)
 
 def create_user(username, email, password, role='user'):
     """Create a new user"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return False
-    
-    try:
-        cursor = conn.cursor()
-        password_hash = hash_password(password)
-        
-        cursor.execute("""
-            INSERT INTO users (username, email, password_hash, role)
-            VALUES (%s, %s, %s, %s)
-        """, (username, email, password_hash, role))
+    with get_db_connection() as conn:
+        cursor = None
         
-        conn.commit()
-        return True
-        
-    except psycopg2.IntegrityError:
-        # Username or email already exists
-        return False
-    except Exception as e:
-        print(f"Error creating user: {e}")
-        return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            password_hash = hash_password(password)
+            
+            cursor.execute("""
+                INSERT INTO users (username, email, password_hash, role)
+                VALUES (%s, %s, %s, %s)
+            """, (username, email, password_hash, role))
+            
+            conn.commit()
+            return True
+            
+        except psycopg2.IntegrityError:
+            # Username or email already exists
+            return False
+        except Exception as e:
+            print(f"Error creating user: {e}")
+            return False
+        finally:
+            if cursor:
+                cursor.close()
 
 def authenticate_user(username, password):
     """Authenticate user and return user data"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        password_hash = hash_password(password)
-        
-        cursor.execute("""
-            SELECT id, username, email, role
-            FROM users
-            WHERE username = %s AND password_hash = %s
-        """, (username, password_hash))
-        
-        user_data = cursor.fetchone()
-        
-        if user_data:
-            return {
-                'id': user_data[0],
-                'username': user_data[1],
-                'email': user_data[2],
-                'role': user_data[3]
-            }
-        return None
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Authentication error: {e}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            execute_prepared(cursor, 'auth_stmt', (username,))
+            
+            user_data = cursor.fetchone()
+            
+            if user_data and verify_password(password, user_data[4]):
+                if not user_data[4].startswith('$2'):
+                    # Upgrade legacy SHA256 hashes on successful login; a failed
+                    # upgrade keeps the old hash and does not block the login
+                    try:
+                        cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s",
+                                       (hash_password(password), user_data[0]))
+                        conn.commit()
+                    except (ValueError, psycopg2.Error) as e:
+                        conn.rollback()
+                        print(f"Password hash upgrade skipped: {e}")
+                return {
+                    'id': user_data[0],
+                    'username': user_data[1],
+                    'email': user_data[2],
+                    'role': user_data[3]
+                }
+            return None
+            
+        except Exception as e:
+            print(f"Authentication error: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
 
 def get_user_role(user_id):
     """Get user role by ID"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT role FROM users WHERE id = %s", (user_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Error getting user role: {e}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            execute_prepared(cursor, 'user_role_stmt', (user_id,))
+            result = cursor.fetchone()
+            return result[0] if result else None
+            
+        except Exception as e:
+            print(f"Error getting user role: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
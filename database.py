@@ -1,256 +1,945 @@
 import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import os
-from datetime import datetime
-import json
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from utils import safe_json_dumps
 
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 10
+
+# Seconds to wait for a pooled connection to be returned before giving up
+POOL_ACQUIRE_TIMEOUT = 30
+
+# Slice size used when reading image blobs back out of medical_images
+IMAGE_CHUNK_SIZE = 1 << 20
+
+# Rows sent per INSERT statement by the bulk store helpers. Image rows carry
+# the whole upload (up to 50 MB, hex-escaped in the SQL text), so they get
+# a much smaller page than the analysis rows
+BULK_INSERT_PAGE_SIZE = 500
+IMAGE_INSERT_PAGE_SIZE = 4
+
+# Text searched by the admin user search, shared with its trigram index so
+# the planner can use it. The unit separator cannot be typed into the search
+# box, so a term never matches across the end of username and start of email
+USER_SEARCH_TEXT = "username || E'\\x1f' || email"
+
+# Number of equal-width buckets in the admin confidence histogram
+CONFIDENCE_HISTOGRAM_BINS = 20
+
+# Hot-path statements that are parsed and planned once per connection.
+# Each entry maps a statement name to (parameter types, query).
+PREPARED_STATEMENTS = {
+    'auth_stmt': ('text', """
+        SELECT id, username, email, role, password_hash
+        FROM users
+        WHERE username = $1
+    """),
+    'user_role_stmt': ('integer', """
+        SELECT role FROM users WHERE id = $1
+    """),
+    'image_meta_stmt': ('integer', """
+        SELECT octet_length(image_data), filename, image_type
+        FROM medical_images
+        WHERE id = $1
+    """),
+    'image_chunk_stmt': ('integer, integer, integer', """
+        SELECT substring(image_data FROM $1 FOR $2)
+        FROM medical_images
+        WHERE id = $3
+    """),
+}
+
+# Indexes created by init_database, keyed by index name so existing ones
+# can be skipped without issuing any DDL; IF NOT EXISTS still guards against
+# another process creating the same index concurrently
+# (users.username is already indexed by its UNIQUE constraint)
+SCHEMA_INDEXES = {
+    'idx_users_created_at': "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at DESC)",
+    'idx_users_username_covering': """
+        CREATE INDEX IF NOT EXISTS idx_users_username_covering
+        ON users (username) INCLUDE (id, email, role, password_hash)
+    """,
+    'idx_images_upload_date': "CREATE INDEX IF NOT EXISTS idx_images_upload_date ON medical_images (upload_date DESC)",
+    'idx_images_user_id': "CREATE INDEX IF NOT EXISTS idx_images_user_id ON medical_images (user_id)",
+    'idx_images_user_hash': """
+        CREATE INDEX IF NOT EXISTS idx_images_user_hash
+        ON medical_images (user_id, file_hash) WHERE file_hash IS NOT NULL
+    """,
+    'idx_analysis_image_id': """
+        CREATE INDEX IF NOT EXISTS idx_analysis_image_id
+        ON analysis_results (image_id, analysis_date DESC)
+    """,
+    'idx_analysis_prediction_conf': """
+        CREATE INDEX IF NOT EXISTS idx_analysis_prediction_conf
+        ON analysis_results (prediction, confidence_score)
+    """,
+}
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which PREPARED_STATEMENTS it has prepared"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+def execute_prepared(cursor, name, params):
+    """Execute a named statement from PREPARED_STATEMENTS, preparing it on first use"""
+    conn = cursor.connection
+    if name not in conn.prepared_statements:
+        param_types, query = PREPARED_STATEMENTS[name]
+        # Prepared statements are session-level and survive transaction rollback
+        cursor.execute(f"PREPARE {name} ({param_types}) AS {query}")
+        conn.prepared_statements.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+
+class DatabaseUnavailableError(Exception):
+    """Raised when no database connection can be obtained"""
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises as soon as it is exhausted, so borrowers
+# queue here for one of its POOL_MAX_CONNECTIONS slots instead
+_pool_slots = threading.BoundedSemaphore(POOL_MAX_CONNECTIONS)
+
+def _get_pool():
+    """Create the shared connection pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    POOL_MIN_CONNECTIONS,
+                    POOL_MAX_CONNECTIONS,
+                    host=os.getenv("PGHOST", "localhost"),
+                    database=os.getenv("PGDATABASE", "lung_cancer_db"),
+                    user=os.getenv("PGUSER", "postgres"),
+                    password=os.getenv("PGPASSWORD", "password"),
+                    port=os.getenv("PGPORT", "5432"),
+                    connection_factory=PreparingConnection
+                )
+    return _pool
+
+@contextmanager
 def get_db_connection():
-    """Get database connection using environment variables"""
-    try:
-        conn = psycopg2.connect(
-            host=os.getenv("PGHOST", "localhost"),
-            database=os.getenv("PGDATABASE", "lung_cancer_db"),
-            user=os.getenv("PGUSER", "postgres"),
-            password=os.getenv("PGPASSWORD", "password"),
-            port=os.getenv("PGPORT", "5432")
-        )
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+    """Borrow a pooled database connection, waiting for one to become free
 
-def init_database():
-    """Initialize database tables"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return False
+    Raises DatabaseUnavailableError if no connection can be obtained.
+    """
+    if not _pool_slots.acquire(timeout=POOL_ACQUIRE_TIMEOUT):
+        raise DatabaseUnavailableError("Timed out waiting for a free database connection")
     
+    pool = None
+    conn = None
     try:
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                role VARCHAR(20) DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        try:
+            pool = _get_pool()
+            conn = pool.getconn()
+        except Exception as e:
+            raise DatabaseUnavailableError(f"Database connection error: {e}") from e
         
-        # Create images table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS medical_images (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id),
-                filename VARCHAR(255) NOT NULL,
-                image_data BYTEA NOT NULL,
-                upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                image_type VARCHAR(50),
-                file_size INTEGER
-            )
-        """)
-        
-        # Create analysis results table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS analysis_results (
-                id SERIAL PRIMARY KEY,
-                image_id INTEGER REFERENCES medical_images(id),
-                user_id INTEGER REFERENCES users(id),
-                prediction VARCHAR(100) NOT NULL,
-                confidence_score FLOAT NOT NULL,
-                analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                detailed_results JSON,
-                processing_time FLOAT
-            )
-        """)
+        yield conn
+    finally:
+        if conn is not None:
+            try:
+                # Discard any uncommitted or aborted transaction before reuse
+                if not conn.closed:
+                    conn.rollback()
+            except psycopg2.Error:
+                pass
+            pool.putconn(conn, close=bool(conn.closed))
+        _pool_slots.release()
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def init_database():
+    """Initialize database tables once per process"""
+    # app.py calls this on every rerun; the DDL below takes table locks,
+    # so only run it until it has succeeded once
+    global _schema_ready
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                _schema_ready = _create_schema()
+    return _schema_ready
+
+def _create_schema():
+    """Create the tables, columns and indexes the app relies on"""
+    with get_db_connection() as conn:
+        cursor = None
         
-        conn.commit()
-        return True
+        try:
+            cursor = conn.cursor()
+            
+            # Create users table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    username VARCHAR(50) UNIQUE NOT NULL,
+                    email VARCHAR(100) UNIQUE NOT NULL,
+                    password_hash VARCHAR(255) NOT NULL,
+                    role VARCHAR(20) DEFAULT 'user',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create images table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS medical_images (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id),
+                    filename VARCHAR(255) NOT NULL,
+                    image_data BYTEA NOT NULL,
+                    upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    image_type VARCHAR(50),
+                    file_size INTEGER,
+                    file_hash CHAR(64)
+                )
+            """)
+            # SHA-256 of the upload, used to recognise re-uploads of the same file.
+            # ADD COLUMN IF NOT EXISTS still takes an exclusive lock, so check first.
+            cursor.execute("""
+                SELECT 1 FROM pg_attribute
+                WHERE attrelid = 'medical_images'::regclass AND attname = 'file_hash' AND NOT attisdropped
+            """)
+            if cursor.fetchone() is None:
+                cursor.execute("ALTER TABLE medical_images ADD COLUMN file_hash CHAR(64)")
+            
+            # Images are already compressed; store them uncompressed out of line
+            # so substring() reads in get_image_data only fetch the slice needed.
+            # The ALTER takes an exclusive lock, so skip it once it has been applied.
+            cursor.execute("""
+                SELECT attstorage FROM pg_attribute
+                WHERE attrelid = 'medical_images'::regclass AND attname = 'image_data'
+            """)
+            if cursor.fetchone()[0] != 'e':
+                cursor.execute("ALTER TABLE medical_images ALTER COLUMN image_data SET STORAGE EXTERNAL")
+            
+            # Create analysis results table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    id SERIAL PRIMARY KEY,
+                    image_id INTEGER REFERENCES medical_images(id),
+                    user_id INTEGER REFERENCES users(id),
+                    prediction VARCHAR(100) NOT NULL,
+                    confidence_score FLOAT NOT NULL,
+                    analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    detailed_results JSON,
+                    processing_time FLOAT
+                )
+            """)
+
+            # Create only the indexes that are missing for the admin listings and joins
+            cursor.execute("""
+                SELECT indexname FROM pg_indexes
+                WHERE schemaname = current_schema()
+            """)
+            existing_indexes = {row[0] for row in cursor.fetchall()}
+            for index_name, query in SCHEMA_INDEXES.items():
+                if index_name not in existing_indexes:
+                    cursor.execute(query)
+            
+            # Trigram index for substring user search; pg_trgm may not be
+            # installable without superuser rights, so keep it optional.
+            # It replaces idx_users_trgm, which joined the fields with a space
+            if 'idx_users_search_trgm' not in existing_indexes:
+                cursor.execute("SAVEPOINT user_search_index")
+                try:
+                    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                    cursor.execute(f"""
+                        CREATE INDEX IF NOT EXISTS idx_users_search_trgm
+                        ON users USING gin (({USER_SEARCH_TEXT}) gin_trgm_ops)
+                    """)
+                    cursor.execute("DROP INDEX IF EXISTS idx_users_trgm")
+                except psycopg2.Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT user_search_index")
+                    print(f"User search index not created: {e}")
+
+            conn.commit()
+            return True
+            
+        except Exception as e:
+            print(f"Database initialization error: {e}")
+            return False
+        finally:
+            if cursor:
+                cursor.close()
+
+def store_images_bulk(rows):
+    """Store several medical images in one transaction and return their IDs
+
+    Each row is (user_id, filename, image_data, image_type, file_size, file_hash).
+    """
+    if not rows:
+        return []
+    
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Database initialization error: {e}")
-        return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            results = execute_values(cursor, """
+                INSERT INTO medical_images (user_id, filename, image_data, image_type, file_size, file_hash)
+                VALUES %s
+                RETURNING id
+            """, rows, page_size=IMAGE_INSERT_PAGE_SIZE, fetch=True)
+            
+            conn.commit()
+            return [result[0] for result in results]
+            
+        except Exception as e:
+            print(f"Error storing images: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
 
-def store_image(user_id, filename, image_data, image_type, file_size):
+def store_image(user_id, filename, image_data, image_type, file_size, file_hash=None):
     """Store medical image in database"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO medical_images (user_id, filename, image_data, image_type, file_size)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id
-        """, (user_id, filename, image_data, image_type, file_size))
+    image_ids = store_images_bulk([(user_id, filename, image_data, image_type, file_size, file_hash)])
+    return image_ids[0] if image_ids else None
+
+def find_analyzed_image_by_hash(user_id, file_hash):
+    """Find the user's latest successfully analysed upload with this content hash
+
+    Returns (image_id, prediction, confidence_score, detailed_results,
+    processing_time) or None.
+    """
+    with get_db_connection() as conn:
+        cursor = None
         
-        result = cursor.fetchone()
-        if not result:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT mi.id, ar.prediction, ar.confidence_score, ar.detailed_results, ar.processing_time
+                FROM medical_images mi
+                JOIN LATERAL (
+                    SELECT prediction, confidence_score, detailed_results, processing_time
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+                WHERE mi.user_id = %s AND mi.file_hash = %s AND ar.prediction <> 'Analysis Failed'
+                ORDER BY mi.upload_date DESC
+                LIMIT 1
+            """, (user_id, file_hash))
+            
+            return cursor.fetchone()
+            
+        except Exception as e:
+            print(f"Error finding image by hash: {e}")
             return None
-        image_id = result[0]
-        conn.commit()
-        return image_id
+        finally:
+            if cursor:
+                cursor.close()
+
+def store_analysis_results_bulk(rows):
+    """Store several analysis results in one transaction and return their IDs
+
+    Each row is (image_id, user_id, prediction, confidence_score,
+    detailed_results, processing_time).
+    """
+    if not rows:
+        return []
+    
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Error storing image: {e}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            values = [
+                (image_id, user_id, prediction, confidence_score, safe_json_dumps(detailed_results), processing_time)
+                for image_id, user_id, prediction, confidence_score, detailed_results, processing_time in rows
+            ]
+            results = execute_values(cursor, """
+                INSERT INTO analysis_results (image_id, user_id, prediction, confidence_score, detailed_results, processing_time)
+                VALUES %s
+                RETURNING id
+            """, values, page_size=BULK_INSERT_PAGE_SIZE, fetch=True)
+            
+            conn.commit()
+            return [result[0] for result in results]
+            
+        except Exception as e:
+            print(f"Error storing analysis results: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
 
 def store_analysis_result(image_id, user_id, prediction, confidence_score, detailed_results, processing_time):
     """Store analysis result in database"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return None
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO analysis_results (image_id, user_id, prediction, confidence_score, detailed_results, processing_time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (image_id, user_id, prediction, confidence_score, json.dumps(detailed_results), processing_time))
-        
-        result = cursor.fetchone()
-        if not result:
-            return None
-        result_id = result[0]
-        conn.commit()
-        return result_id
-        
-    except Exception as e:
-        print(f"Error storing analysis result: {e}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+    result_ids = store_analysis_results_bulk(
+        [(image_id, user_id, prediction, confidence_score, detailed_results, processing_time)]
+    )
+    return result_ids[0] if result_ids else None
 
 def get_user_images(user_id):
     """Get all images for a specific user"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return []
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT mi.id, mi.filename, mi.upload_date, mi.image_type, mi.file_size,
-                   ar.prediction, ar.confidence_score, ar.analysis_date
-            FROM medical_images mi
-            LEFT JOIN analysis_results ar ON mi.id = ar.image_id
-            WHERE mi.user_id = %s
-            ORDER BY mi.upload_date DESC
-        """, (user_id,))
+    with get_db_connection() as conn:
+        cursor = None
         
-        results = cursor.fetchall()
-        return results
-        
-    except Exception as e:
-        print(f"Error getting user images: {e}")
-        return []
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT mi.id, mi.filename, mi.upload_date, mi.image_type, mi.file_size,
+                       ar.prediction, ar.confidence_score, ar.analysis_date
+                FROM medical_images mi
+                LEFT JOIN LATERAL (
+                    SELECT id, prediction, confidence_score, analysis_date
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+                WHERE mi.user_id = %s
+                ORDER BY mi.upload_date DESC
+            """, (user_id,))
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting user images: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
 
 def get_all_users():
     """Get all users (admin function)"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return []
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, username, email, role, created_at
+                FROM users
+                ORDER BY created_at DESC
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting users: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def query_users(term=None, offset=0, limit=50):
+    """Get one page of users matching a search term and the total match count (admin function)"""
+    conditions = "TRUE"
+    params = []
+    if term:
+        # Escape LIKE wildcards so the term is matched literally
+        pattern = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions = f"({USER_SEARCH_TEXT}) ILIKE %s"
+        params.append(f"%{pattern}%")
     
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, username, email, role, created_at
-            FROM users
-            ORDER BY created_at DESC
-        """)
+    with get_db_connection() as conn:
+        cursor = None
         
-        results = cursor.fetchall()
-        return results
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, username, email, role, created_at,
+                       COUNT(*) OVER () AS total_rows
+                FROM users
+                WHERE {conditions}
+                ORDER BY created_at DESC, id DESC
+                OFFSET %s LIMIT %s
+            """, (*params, offset, limit))
+            
+            results = cursor.fetchall()
+            total_rows = results[0][-1] if results else 0
+            return [row[:-1] for row in results], total_rows
+            
+        except Exception as e:
+            print(f"Error querying users: {e}")
+            return [], 0
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_role_counts():
+    """Get user counts per role (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Error getting users: {e}")
-        return []
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT role, COUNT(*)
+                FROM users
+                GROUP BY role
+                ORDER BY COUNT(*) DESC
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting role counts: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
 
 def get_all_images():
     """Get all images across all users (admin function)"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return []
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT mi.id, u.username, mi.filename, mi.upload_date, mi.image_type,
+                       ar.prediction, ar.confidence_score, ar.analysis_date
+                FROM medical_images mi
+                JOIN users u ON mi.user_id = u.id
+                LEFT JOIN LATERAL (
+                    SELECT id, prediction, confidence_score, analysis_date
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+                ORDER BY mi.upload_date DESC
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting all images: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_recent_images(limit=10):
+    """Get the most recently uploaded images across all users (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT mi.id, u.username, mi.filename, mi.upload_date, mi.image_type,
+                       ar.prediction, ar.confidence_score, ar.analysis_date
+                FROM medical_images mi
+                JOIN users u ON mi.user_id = u.id
+                LEFT JOIN LATERAL (
+                    SELECT id, prediction, confidence_score, analysis_date
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+                ORDER BY mi.upload_date DESC
+                LIMIT %s
+            """, (limit,))
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting recent images: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def query_images(user=None, prediction=None, min_conf=0.0, offset=0, limit=50):
+    """Get one filtered page of images and the total match count (admin function)"""
+    conditions = []
+    params = []
+    if user is not None:
+        conditions.append("u.username = %s")
+        params.append(user)
+    if prediction is not None:
+        conditions.append("ar.prediction = %s")
+        params.append(prediction)
+    if min_conf > 0:
+        conditions.append("ar.confidence_score >= %s")
+        params.append(min_conf)
+    where_clause = " AND ".join(conditions) if conditions else "TRUE"
     
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT mi.id, u.username, mi.filename, mi.upload_date, mi.image_type,
-                   ar.prediction, ar.confidence_score, ar.analysis_date
-            FROM medical_images mi
-            JOIN users u ON mi.user_id = u.id
-            LEFT JOIN analysis_results ar ON mi.id = ar.image_id
-            ORDER BY mi.upload_date DESC
-        """)
+    with get_db_connection() as conn:
+        cursor = None
         
-        results = cursor.fetchall()
-        return results
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT mi.id, u.username, mi.filename, mi.upload_date, mi.image_type,
+                       ar.prediction, ar.confidence_score, ar.analysis_date,
+                       COUNT(*) OVER () AS total_rows
+                FROM medical_images mi
+                JOIN users u ON mi.user_id = u.id
+                LEFT JOIN LATERAL (
+                    SELECT id, prediction, confidence_score, analysis_date
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+                WHERE {where_clause}
+                ORDER BY mi.upload_date DESC, mi.id DESC
+                OFFSET %s LIMIT %s
+            """, (*params, offset, limit))
+            
+            results = cursor.fetchall()
+            total_rows = results[0][-1] if results else 0
+            return [row[:-1] for row in results], total_rows
+            
+        except Exception as e:
+            print(f"Error querying images: {e}")
+            return [], 0
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_dashboard_metrics():
+    """Get aggregated system metrics for the admin overview (admin function)"""
+    metrics = {
+        'total_users': 0,
+        'recent_users': 0,
+        'total_images': 0,
+        'recent_images': 0,
+        'cancer_detected': 0,
+        'avg_confidence': 0.0
+    }
+    
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Error getting all images: {e}")
-        return []
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE created_at > CURRENT_TIMESTAMP - INTERVAL '30 days')
+                FROM users
+            """)
+            total_users, recent_users = cursor.fetchone()
+            
+            cursor.execute("""
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE mi.upload_date > CURRENT_TIMESTAMP - INTERVAL '30 days'),
+                       COUNT(ar.id) FILTER (WHERE ar.prediction ILIKE '%Cancer%'),
+                       AVG(ar.confidence_score)
+                FROM medical_images mi
+                LEFT JOIN LATERAL (
+                    SELECT id, prediction, confidence_score, analysis_date
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+            """)
+            total_images, recent_images, cancer_detected, avg_confidence = cursor.fetchone()
+            
+            metrics.update({
+                'total_users': total_users,
+                'recent_users': recent_users,
+                'total_images': total_images,
+                'recent_images': recent_images,
+                'cancer_detected': cancer_detected,
+                'avg_confidence': float(avg_confidence) if avg_confidence is not None else 0.0
+            })
+            return metrics
+            
+        except Exception as e:
+            print(f"Error getting dashboard metrics: {e}")
+            return metrics
+        finally:
+            if cursor:
+                cursor.close()
 
 def get_image_data(image_id):
-    """Get image data by ID"""
-    conn = get_db_connection()
-    cursor = None
-    if not conn:
-        return None
+    """Get image data by ID, reading the blob in chunks"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            execute_prepared(cursor, 'image_meta_stmt', (image_id,))
+            
+            result = cursor.fetchone()
+            if not result:
+                return None
+            size, filename, image_type = result
+            
+            # Pull the blob in fixed-size slices so neither side has to
+            # buffer the whole (hex-escaped) value in a single message
+            buffer = io.BytesIO()
+            for offset in range(0, size, IMAGE_CHUNK_SIZE):
+                execute_prepared(cursor, 'image_chunk_stmt', (offset + 1, IMAGE_CHUNK_SIZE, image_id))
+                buffer.write(cursor.fetchone()[0])
+            
+            return buffer.getvalue(), filename, image_type
+            
+        except Exception as e:
+            print(f"Error getting image data: {e}")
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_prediction_counts():
+    """Get image counts per latest prediction (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT prediction, COUNT(*)
+                FROM (
+                    SELECT DISTINCT ON (image_id) prediction
+                    FROM analysis_results
+                    ORDER BY image_id, analysis_date DESC
+                ) latest
+                GROUP BY prediction
+                ORDER BY COUNT(*) DESC
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting prediction counts: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_confidence_histogram(bins=CONFIDENCE_HISTOGRAM_BINS):
+    """Get latest confidence scores binned into equal-width buckets (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            # width_bucket puts a score of exactly 1.0 in bucket bins + 1
+            cursor.execute("""
+                SELECT LEAST(width_bucket(confidence_score, 0, 1, %s), %s) AS bin, COUNT(*)
+                FROM (
+                    SELECT DISTINCT ON (image_id) confidence_score
+                    FROM analysis_results
+                    ORDER BY image_id, analysis_date DESC
+                ) latest
+                WHERE confidence_score IS NOT NULL
+                GROUP BY bin
+                ORDER BY bin
+            """, (bins, bins))
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting confidence histogram: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_daily_uploads():
+    """Get image upload counts per day (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT date_trunc('day', upload_date) AS day, COUNT(*)
+                FROM medical_images
+                GROUP BY day
+                ORDER BY day
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting daily uploads: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_user_signup_dates():
+    """Get user registration counts per day (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT created_at::date AS day, COUNT(*)
+                FROM users
+                GROUP BY day
+                ORDER BY day
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting user signup dates: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_top_uploaders(limit=10):
+    """Get the users with the most uploaded images (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT u.username, COUNT(*) AS uploads
+                FROM medical_images mi
+                JOIN users u ON u.id = mi.user_id
+                GROUP BY u.username
+                ORDER BY uploads DESC
+                LIMIT %s
+            """, (limit,))
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting top uploaders: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_uploader_names():
+    """Get the usernames of everyone who has uploaded an image (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT u.username
+                FROM medical_images mi
+                JOIN users u ON u.id = mi.user_id
+                ORDER BY u.username
+            """)
+            
+            return [row[0] for row in cursor.fetchall()]
+            
+        except Exception as e:
+            print(f"Error getting uploader names: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_image_statistics():
+    """Get image, analysis and confidence aggregates for system statistics (admin function)"""
+    stats = {
+        'total_images': 0,
+        'analyzed_images': 0,
+        'active_users': 0,
+        'mean_confidence': None,
+        'median_confidence': None,
+        'std_confidence': None,
+        'high_confidence': 0,
+        'low_confidence': 0
+    }
     
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT image_data, filename, image_type
-            FROM medical_images
-            WHERE id = %s
-        """, (image_id,))
+    with get_db_connection() as conn:
+        cursor = None
         
-        result = cursor.fetchone()
-        return result
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*),
+                       COUNT(ar.prediction),
+                       COUNT(DISTINCT mi.user_id),
+                       AVG(ar.confidence_score),
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY ar.confidence_score),
+                       stddev_samp(ar.confidence_score),
+                       COUNT(*) FILTER (WHERE ar.confidence_score > 0.8),
+                       COUNT(*) FILTER (WHERE ar.confidence_score < 0.6)
+                FROM medical_images mi
+                LEFT JOIN LATERAL (
+                    SELECT prediction, confidence_score
+                    FROM analysis_results
+                    WHERE image_id = mi.id
+                    ORDER BY analysis_date DESC
+                    LIMIT 1
+                ) ar ON TRUE
+            """)
+            
+            stats.update(zip(stats, cursor.fetchone()))
+            return stats
+            
+        except Exception as e:
+            print(f"Error getting image statistics: {e}")
+            return stats
+        finally:
+            if cursor:
+                cursor.close()
+
+def get_confidence_by_prediction():
+    """Get mean latest confidence and image count per prediction (admin function)"""
+    with get_db_connection() as conn:
+        cursor = None
         
-    except Exception as e:
-        print(f"Error getting image data: {e}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT prediction, AVG(confidence_score), COUNT(confidence_score)
+                FROM (
+                    SELECT DISTINCT ON (image_id) prediction, confidence_score
+                    FROM analysis_results
+                    ORDER BY image_id, analysis_date DESC
+                ) latest
+                GROUP BY prediction
+                ORDER BY prediction
+            """)
+            
+            results = cursor.fetchall()
+            return results
+            
+        except Exception as e:
+            print(f"Error getting confidence by prediction: {e}")
+            return []
+        finally:
+            if cursor:
+                cursor.close()
+
+@dataclass
+class DashboardBundle:
+    """Everything the admin overview reads on each render"""
+    metrics: dict = field(default_factory=dict)
+    recent_images: list = field(default_factory=list)
+
+def fetch_dashboard_bundle(recent_limit=10):
+    """Run the admin overview queries concurrently (admin function)"""
+    # Each query checks out its own pooled connection, so the round-trips overlap
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        metrics = executor.submit(get_dashboard_metrics)
+        recent_images = executor.submit(get_recent_images, recent_limit)
+        
+        return DashboardBundle(
+            metrics=metrics.result(),
+            recent_images=recent_images.result()
+        )
@@ -0,0 +1,63 @@
+import io
+import streamlit as st
+from PIL import Image
+from database import (
+    fetch_dashboard_bundle, query_images, query_users, get_image_data,
+    get_role_counts, get_user_signup_dates, get_prediction_counts, get_confidence_histogram,
+    get_uploader_names, get_daily_uploads, get_top_uploaders,
+    get_image_statistics, get_confidence_by_prediction
+)
+
+# Admin reads are shared across Streamlit reruns for a short window
+ADMIN_CACHE_TTL = 30
+
+@st.cache_data(ttl=ADMIN_CACHE_TTL, show_spinner=False)
+def cached_fetch_dashboard_bundle(recent_limit=10):
+    """Cached version of fetch_dashboard_bundle"""
+    return fetch_dashboard_bundle(recent_limit)
+
+@st.cache_data(ttl=ADMIN_CACHE_TTL, show_spinner=False)
+def cached_user_management_data():
+    """Role counts and daily signups for the User Management section"""
+    return get_role_counts(), get_user_signup_dates()
+
+@st.cache_data(ttl=ADMIN_CACHE_TTL, show_spinner=False)
+def cached_query_users(term=None, offset=0, limit=50):
+    """Cached version of query_users"""
+    return query_users(term, offset, limit)
+
+@st.cache_data(ttl=ADMIN_CACHE_TTL, show_spinner=False)
+def cached_image_analysis_data():
+    """Chart aggregates and filter options for the Image Analysis section"""
+    return get_prediction_counts(), get_confidence_histogram(), get_uploader_names()
+
+@st.cache_data(ttl=ADMIN_CACHE_TTL, show_spinner=False)
+def cached_system_statistics_data(top_limit=10):
+    """Aggregates for the System Statistics section"""
+    return (get_image_statistics(), get_confidence_by_prediction(),
+            get_daily_uploads(), get_top_uploaders(top_limit))
+
+@st.cache_data(ttl=ADMIN_CACHE_TTL, show_spinner=False)
+def cached_query_images(user=None, prediction=None, min_conf=0.0, offset=0, limit=50):
+    """Cached version of query_images"""
+    return query_images(user, prediction, min_conf, offset, limit)
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def load_decoded_image(image_id):
+    """Fetch and decode a stored image once, for repeated viewing"""
+    image_data = get_image_data(image_id)
+    if not image_data:
+        return None
+    image_bytes, filename, image_type = image_data
+    # copy() forces the decode and detaches the image from the byte buffer
+    image = Image.open(io.BytesIO(image_bytes)).copy()
+    return image, filename, image_type, image.size
+
+def invalidate_admin_cache():
+    """Drop cached admin reads after users, images or results are written"""
+    cached_fetch_dashboard_bundle.clear()
+    cached_user_management_data.clear()
+    cached_image_analysis_data.clear()
+    cached_system_statistics_data.clear()
+    cached_query_users.clear()
+    cached_query_images.clear()
@@ -3,6 +3,41 @@ import numpy as np
 from PIL import Image
 import io
 import base64
+import threading
+
+# Annotation text style used by create_annotated_image
+ANNOTATION_FONT = cv2.FONT_HERSHEY_SIMPLEX
+ANNOTATION_FONT_SCALE = 0.7
+ANNOTATION_THICKNESS = 2
+
+def _cuda_available():
+    """Check whether OpenCV was built with CUDA and can see a GPU"""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+# Run display enhancement on the GPU when OpenCV's CUDA module is usable
+USE_CUDA = _cuda_available()
+
+# CLAHE objects keep scratch buffers between calls, so each thread gets its own
+_clahe_local = threading.local()
+
+def _get_clahe():
+    """Return this thread's display CLAHE instance, creating it on first use"""
+    clahe = getattr(_clahe_local, 'clahe', None)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        _clahe_local.clahe = clahe
+    return clahe
+
+def _get_cuda_clahe():
+    """Return this thread's GPU CLAHE instance, creating it on first use"""
+    clahe = getattr(_clahe_local, 'cuda_clahe', None)
+    if clahe is None:
+        clahe = cv2.cuda.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        _clahe_local.cuda_clahe = clahe
+    return clahe
 
 def process_uploaded_image(uploaded_file):
     """Process uploaded image file"""
@@ -10,22 +45,30 @@ def process_uploaded_image(uploaded_file):
         # Read the uploaded file
         image_data = uploaded_file.read()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(image_data))
+        # Decode straight from the byte buffer with OpenCV (keeping PIL's
+        # behaviour of not applying EXIF orientation)
+        buffer = np.frombuffer(image_data, dtype=np.uint8)
+        image_array = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
         
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        if image_array is not None:
+            cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB, dst=image_array)
+        else:
+            # Fall back to PIL for formats OpenCV cannot decode (e.g. GIF)
+            image = Image.open(io.BytesIO(image_data))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            # Wrap PIL's pixel bytes without a second copy; the array is read-only
+            image_array = np.asarray(image)
         
-        # Convert to numpy array
-        image_array = np.array(image)
+        # Opening with PIL only parses the header, which names the format
+        image_format = Image.open(io.BytesIO(image_data)).format
         
         # Get file info
         file_info = {
             'filename': uploaded_file.name,
             'size': len(image_data),
-            'format': image.format if hasattr(image, 'format') else 'Unknown',
-            'dimensions': image.size
+            'format': image_format or 'Unknown',
+            'dimensions': image_array.shape[:2][::-1]
         }
         
         return image_array, image_data, file_info
@@ -34,14 +77,16 @@ def process_uploaded_image(uploaded_file):
         print(f"Error processing image: {e}")
         return None, None, None
 
-def preprocess_medical_image(image):
-    """Preprocess medical image for analysis"""
+def to_grayscale(image):
+    """Return a single-channel version of an RGB or grayscale image"""
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
+
+def preprocess_medical_image(image, gray=None):
+    """Preprocess medical image for analysis, reusing gray if already computed"""
     try:
         # Convert to grayscale
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = image
+        if gray is None:
+            gray = to_grayscale(image)
         
         # Apply histogram equalization to improve contrast
         equalized = cv2.equalizeHist(gray)
@@ -58,19 +103,44 @@ def preprocess_medical_image(image):
         print(f"Error preprocessing image: {e}")
         return image
 
+def _enhance_on_gpu(image):
+    """Apply the display CLAHE on the GPU, keeping intermediates in device memory"""
+    gpu_image = cv2.cuda_GpuMat()
+    gpu_image.upload(image)
+    clahe = _get_cuda_clahe()
+    stream = cv2.cuda.Stream_Null()
+    
+    if len(image.shape) == 3:
+        lab = cv2.cuda.cvtColor(gpu_image, cv2.COLOR_RGB2LAB)
+        l_channel, a_channel, b_channel = cv2.cuda.split(lab)
+        l_channel = clahe.apply(l_channel, stream)
+        lab = cv2.cuda.merge([l_channel, a_channel, b_channel])
+        enhanced = cv2.cuda.cvtColor(lab, cv2.COLOR_LAB2RGB)
+    else:
+        enhanced = clahe.apply(gpu_image, stream)
+    
+    return enhanced.download()
+
 def enhance_image_for_display(image):
     """Enhance image for better visualization"""
+    if USE_CUDA:
+        try:
+            return _enhance_on_gpu(image)
+        except (AttributeError, cv2.error) as e:
+            # AttributeError covers OpenCV builds without the cuda bindings
+            print(f"GPU enhancement failed, using CPU: {e}")
+    
     try:
         # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
         if len(image.shape) == 3:
             # For color images, apply CLAHE to the L channel in LAB color space
             lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+            clahe = _get_clahe()
             lab[:, :, 0] = clahe.apply(lab[:, :, 0])
             enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
         else:
             # For grayscale images
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+            clahe = _get_clahe()
             enhanced = clahe.apply(image)
         
         return enhanced
@@ -82,17 +152,17 @@ def enhance_image_for_display(image):
 def create_annotated_image(image, analysis_result):
     """Create annotated image with analysis results"""
     try:
-        # Create a copy of the original image
-        annotated = image.copy()
-        
-        # Convert to RGB if grayscale
-        if len(annotated.shape) == 2:
-            annotated = cv2.cvtColor(annotated, cv2.COLOR_GRAY2RGB)
+        if len(image.shape) == 2:
+            # Converting grayscale to RGB already produces a new buffer
+            annotated = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        else:
+            # Create a copy of the original image
+            annotated = image.copy()
         
         # Add text annotations
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.7
-        thickness = 2
+        font = ANNOTATION_FONT
+        font_scale = ANNOTATION_FONT_SCALE
+        thickness = ANNOTATION_THICKNESS
         
         # Prediction text
         prediction_text = analysis_result.get('prediction', 'Unknown')
@@ -123,8 +193,8 @@ def create_annotated_image(image, analysis_result):
         print(f"Error creating annotated image: {e}")
         return image
 
-def validate_medical_image(image_array, file_info):
-    """Validate if the uploaded image is suitable for medical analysis"""
+def validate_medical_image(image_array, file_info, gray=None):
+    """Validate if the uploaded image is suitable for medical analysis, reusing gray if already computed"""
     try:
         validations = {
             'is_valid': True,
@@ -148,15 +218,19 @@ def validate_medical_image(image_array, file_info):
             validations['warnings'].append("Large file size - processing may be slow")
         
         # Check if image appears to be medical (basic heuristics)
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY) if len(image_array.shape) == 3 else image_array
+        if gray is None:
+            gray = to_grayscale(image_array)
+        
+        # Brightness and contrast in a single pass
+        mean, std = cv2.meanStdDev(gray)
+        mean_brightness = float(mean[0, 0])
+        contrast = float(std[0, 0])
         
         # Check contrast
-        contrast = np.std(gray)
         if contrast < 20:
             validations['warnings'].append("Low contrast image - results may be less reliable")
         
         # Check for very dark or very bright images
-        mean_brightness = np.mean(gray)
         if mean_brightness < 30:
             validations['warnings'].append("Very dark image - may affect analysis accuracy")
         elif mean_brightness > 225:
@@ -174,18 +248,18 @@ def validate_medical_image(image_array, file_info):
 def convert_image_to_base64(image):
     """Convert image to base64 string for storage/display"""
     try:
-        # Convert numpy array to PIL Image
         if isinstance(image, np.ndarray):
-            if len(image.shape) == 2:  # Grayscale
-                pil_image = Image.fromarray(image, mode='L')
-            else:  # RGB
-                pil_image = Image.fromarray(image, mode='RGB')
-        else:
-            pil_image = image
-        
-        # Convert to base64
+            # Encode arrays with OpenCV's libpng at a fast compression level
+            if len(image.shape) == 3:  # RGB
+                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            ok, buffer = cv2.imencode('.png', image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if not ok:
+                raise ValueError("PNG encoding failed")
+            return base64.b64encode(buffer.tobytes()).decode('ascii')
+        
+        # Convert PIL images to base64
         buffer = io.BytesIO()
-        pil_image.save(buffer, format='PNG')
+        image.save(buffer, format='PNG')
         img_base64 = base64.b64encode(buffer.getvalue()).decode()
         
         return img_base64
@@ -199,21 +273,17 @@ def resize_image_for_analysis(image, max_size=512):
     try:
         height, width = image.shape[:2]
         
+        # Images that already fit are returned as-is, before any scaling math
+        longest = height if height > width else width
+        if longest <= max_size:
+            return image
+        
         # Calculate scaling factor
-        scale = min(max_size / width, max_size / height)
-        
-        if scale < 1:
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            
-            if len(image.shape) == 3:
-                resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            else:
-                resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            
-            return resized
+        scale = max_size / longest
+        new_width = int(width * scale)
+        new_height = int(height * scale)
         
-        return image
+        return cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
         
     except Exception as e:
         print(f"Error resizing image: {e}")
@@ -1,15 +1,144 @@
 import numpy as np
 import cv2
-from sklearn.ensemble import RandomForestClassifier
+import lightgbm
+from lightgbm import LGBMClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import joblib
+import hashlib
 import os
-from skimage import feature, measure, filters
-from skimage.segmentation import clear_border
-from skimage.morphology import disk, opening, closing, erosion, dilation
-import matplotlib.pyplot as plt
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor
+from numba import njit
+from dataclasses import dataclass
+from image_processor import resize_image_for_analysis
+
+ANALYSIS_MAX_SIZE = 512
+NODULE_MIN_AREA = 50
+N_FEATURES = 20
+# Edge detection settings of the original skimage canny(sigma=1, 0.1, 0.2) call,
+# whose thresholds apply to the L2 gradient magnitude in raw grey levels
+CANNY_SIGMA = 1
+CANNY_LOW_THRESHOLD = 0.1
+CANNY_HIGH_THRESHOLD = 0.2
+# Features are stored in single precision, matching the tree thresholds
+FEATURE_DTYPE = np.float32
+
+# Bump when the features or the synthetic training data change, so cached
+# models trained on the old layout are retrained instead of loaded
+MODEL_VERSION = 1
+
+# Trained model cache, written on first start and loaded by later processes
+MODEL_PATH = os.environ.get(
+    'LUNG_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lung_model.joblib')
+)
+
+@njit(cache=True, nogil=True)
+def _image_moments(gray):
+    """Return mean, std, skewness and excess kurtosis of a 2D image in one pass"""
+    height, width = gray.shape
+    n = height * width
+    if n == 0:
+        return 0.0, 0.0, 0.0, 0.0
+    
+    s1 = 0.0
+    s2 = 0.0
+    s3 = 0.0
+    s4 = 0.0
+    for i in range(height):
+        for j in range(width):
+            v = float(gray[i, j])
+            v2 = v * v
+            s1 += v
+            s2 += v2
+            s3 += v2 * v
+            s4 += v2 * v2
+    
+    # Central moments from the raw power sums
+    mean = s1 / n
+    ex2 = s2 / n
+    ex3 = s3 / n
+    ex4 = s4 / n
+    mean2 = mean * mean
+    var = ex2 - mean2
+    if var <= 0.0:
+        return mean, 0.0, 0.0, 0.0
+    m3 = ex3 - 3.0 * mean * ex2 + 2.0 * mean2 * mean
+    m4 = ex4 - 4.0 * mean * ex3 + 6.0 * mean2 * ex2 - 3.0 * mean2 * mean2
+    std = math.sqrt(var)
+    return mean, std, m3 / (var * std), m4 / (var * var) - 3.0
+
+def _build_lbp_uniform_lut(points=8):
+    """Map every neighbour bitmask to its uniform LBP code (as skimage 'uniform')"""
+    lut = np.empty(1 << points, dtype=np.uint8)
+    for code in range(1 << points):
+        bits = [(code >> p) & 1 for p in range(points)]
+        changes = sum(bits[p] != bits[p + 1] for p in range(points - 1))
+        lut[code] = sum(bits) if changes <= 2 else points + 1
+    return lut
+
+# Neighbour offsets for P=8, R=1, rounded exactly as skimage does
+LBP_ROW_OFFSETS = np.array([round(-math.sin(2 * np.pi * p / 8), 5) for p in range(8)])
+LBP_COL_OFFSETS = np.array([round(math.cos(2 * np.pi * p / 8), 5) for p in range(8)])
+LBP_UNIFORM_LUT = _build_lbp_uniform_lut()
+
+@njit(inline='always')
+def _pixel_or_zero(img, r, c):
+    """Return a pixel as float, treating out-of-bounds positions as 0"""
+    if r < 0 or r >= img.shape[0] or c < 0 or c >= img.shape[1]:
+        return 0.0
+    return float(img[r, c])
+
+# Serial on purpose: predict_batch and Streamlit sessions already call this
+# from worker threads, and a parallel kernel first launched off the main
+# thread can hang interpreter exit under the TBB threading layer
+@njit(cache=True, nogil=True)
+def _lbp_uniform_p8_r1(img, lut, row_offsets, col_offsets, out):
+    """Uniform LBP with 8 bilinearly interpolated neighbours at radius 1"""
+    height, width = img.shape
+    for i in range(height):
+        for j in range(width):
+            center = float(img[i, j])
+            code = 0
+            for p in range(8):
+                r = i + row_offsets[p]
+                c = j + col_offsets[p]
+                minr = int(math.floor(r))
+                minc = int(math.floor(c))
+                maxr = int(math.ceil(r))
+                maxc = int(math.ceil(c))
+                dr = r - minr
+                dc = c - minc
+                top = (1 - dc) * _pixel_or_zero(img, minr, minc) + dc * _pixel_or_zero(img, minr, maxc)
+                bottom = (1 - dc) * _pixel_or_zero(img, maxr, minc) + dc * _pixel_or_zero(img, maxr, maxc)
+                if (1 - dr) * top + dr * bottom - center >= 0:
+                    code |= 1 << p
+            out[i, j] = lut[code]
+    return out
+
+def _percentiles_from_histogram(gray, percentiles):
+    """Return np.percentile (linear interpolation) of a uint8 image via its 256-bin histogram"""
+    cumulative = np.cumsum(np.bincount(gray.ravel(), minlength=256))
+    positions = (cumulative[-1] - 1) * np.asarray(percentiles, dtype=float) / 100
+    lower = np.floor(positions)
+    # The k-th smallest pixel is the first intensity whose cumulative count exceeds k
+    low_values = np.searchsorted(cumulative, lower, side='right')
+    high_values = np.searchsorted(cumulative, np.ceil(positions), side='right')
+    return low_values + (positions - lower) * (high_values - low_values)
+
+@dataclass
+class _ImageCtx:
+    """Intermediate images and statistics shared within one prediction"""
+    gray: np.ndarray
+    blurred: np.ndarray
+    edges: np.ndarray
+    contours: tuple
+    contour_areas: np.ndarray
+    mean: float
+    std: float
+    skewness: float
+    kurtosis: float
 
 class LungCancerDetector:
     def __init__(self):
@@ -20,19 +149,65 @@ class LungCancerDetector:
     
     def _initialize_model(self):
         """Initialize the machine learning model"""
-        # Use a Random Forest classifier for lung cancer detection
-        self.model = RandomForestClassifier(
+        # Use a gradient boosted tree classifier for lung cancer detection
+        self.model = LGBMClassifier(
             n_estimators=100,
-            max_depth=20,
-            min_samples_split=5,
-            min_samples_leaf=2,
+            num_leaves=31,
             random_state=42,
-            n_jobs=-1
+            verbose=-1
         )
         
+        if self._load_model():
+            return
+        
         # Train with synthetic features for demonstration
         # In a real application, this would be trained on actual medical data
         self._train_initial_model()
+        self._save_model()
+    
+    def _model_fingerprint(self):
+        """Hash of everything that decides what a trained model looks like"""
+        config = (MODEL_VERSION, N_FEATURES, np.dtype(FEATURE_DTYPE).name,
+                  sorted(self.model.get_params().items()), lightgbm.__version__)
+        return hashlib.sha256(repr(config).encode()).hexdigest()
+    
+    def _load_model(self):
+        """Load a previously trained model and scaler from MODEL_PATH"""
+        if not os.path.exists(MODEL_PATH):
+            return False
+        try:
+            cached = joblib.load(MODEL_PATH)
+            if not isinstance(cached, dict) or cached.get('fingerprint') != self._model_fingerprint():
+                print("Cached model was trained with a different configuration, retraining")
+                return False
+            self.model, self.scaler = cached['model'], cached['scaler']
+            self._finalize_model()
+            return True
+        except Exception as e:
+            print(f"Error loading cached model, retraining: {e}")
+            self.scaler = StandardScaler()
+            return False
+    
+    def _save_model(self):
+        """Persist the trained model and scaler so later processes skip training"""
+        try:
+            # Write to a temporary file first so concurrent workers never load a partial dump
+            temp_path = f"{MODEL_PATH}.{os.getpid()}.tmp"
+            joblib.dump({'fingerprint': self._model_fingerprint(), 'model': self.model, 'scaler': self.scaler},
+                        temp_path)
+            os.replace(temp_path, MODEL_PATH)
+        except Exception as e:
+            print(f"Error saving model cache: {e}")
+    
+    def _finalize_model(self):
+        """Derive the fast prediction paths from the fitted model and scaler"""
+        # Plain arrays for scaling single samples without sklearn's validation overhead
+        self._mean = self.scaler.mean_.astype(FEATURE_DTYPE)
+        self._inv_scale = (1.0 / self.scaler.scale_).astype(FEATURE_DTYPE)
+        
+        # Native booster predicts without the sklearn wrapper's per-call checks
+        self._booster = self.model.booster_
+        self.is_trained = True
     
     def _train_initial_model(self):
         """Train the model with synthetic feature patterns"""
@@ -41,7 +216,7 @@ class LungCancerDetector:
         
         # Features: texture, shape, density, size, location-based features
         n_samples = 1000
-        n_features = 20
+        n_features = N_FEATURES
         
         # Generate features for normal cases
         normal_features = np.random.normal(0.3, 0.1, (n_samples//2, n_features))
@@ -56,7 +231,7 @@ class LungCancerDetector:
         y = np.hstack([normal_labels, abnormal_labels])
         
         # Add some realistic constraints
-        X = np.clip(X, 0, 1)
+        X = np.clip(X, 0, 1).astype(FEATURE_DTYPE)
         
         # Train the model
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -65,131 +240,180 @@ class LungCancerDetector:
         X_train_scaled = self.scaler.transform(X_train)
         
         self.model.fit(X_train_scaled, y_train)
-        self.is_trained = True
+        self._finalize_model()
+    
+    def _build_image_ctx(self, image):
+        """Compute the grayscale, blurred and edge images shared by feature extraction and analysis"""
+        # Convert to grayscale if needed
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = image
+        
+        # Normalize the image
+        gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+        
+        # Apply Gaussian blur to reduce noise
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        
+        # Detect edges
+        smoothed = cv2.GaussianBlur(blurred, (0, 0), CANNY_SIGMA)
+        edges = cv2.Canny(smoothed, CANNY_LOW_THRESHOLD, CANNY_HIGH_THRESHOLD, L2gradient=True)
+        
+        # Trace the outlines around the edges once; their enclosed areas feed
+        # both the shape features and the nodule count
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contour_areas = np.array([cv2.contourArea(contour) for contour in contours])
+        
+        mean, std, skewness, kurtosis = _image_moments(gray)
+        
+        return _ImageCtx(gray, blurred, edges, contours, contour_areas, mean, std, skewness, kurtosis)
     
-    def extract_features(self, image):
+    def extract_features(self, image, ctx=None):
         """Extract features from medical image"""
         try:
-            # Convert to grayscale if needed
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = image
-            
-            # Normalize the image
-            gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-            
-            # Apply Gaussian blur to reduce noise
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            if ctx is None:
+                ctx = self._build_image_ctx(image)
+            gray = ctx.gray
+            blurred = ctx.blurred
             
             # Extract texture features using Local Binary Pattern
-            lbp = feature.local_binary_pattern(blurred, 8, 1, method='uniform')
-            lbp_hist, _ = np.histogram(lbp.ravel(), bins=10, range=(0, 10))
-            lbp_hist = lbp_hist.astype(float)
-            lbp_hist /= (lbp_hist.sum() + 1e-6)
+            lbp = _lbp_uniform_p8_r1(blurred, LBP_UNIFORM_LUT, LBP_ROW_OFFSETS, LBP_COL_OFFSETS,
+                                     np.empty_like(blurred))
+            lbp_hist = np.bincount(lbp.ravel(), minlength=10)
             
             # Extract edge features
-            edges = feature.canny(blurred, sigma=1, low_threshold=0.1, high_threshold=0.2)
-            edge_density = np.mean(edges)
+            edge_density = np.count_nonzero(ctx.edges) / ctx.edges.size
             
             # Extract intensity statistics
-            mean_intensity = np.mean(gray)
-            std_intensity = np.std(gray)
-            skewness = self._calculate_skewness(gray)
-            kurtosis = self._calculate_kurtosis(gray)
-            
-            # Extract shape features through contour analysis
-            contours, _ = cv2.findContours(edges.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            mean_intensity, std_intensity = ctx.mean, ctx.std
+            skewness, kurtosis = ctx.skewness, ctx.kurtosis
             
-            if contours:
-                largest_contour = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest_contour)
-                perimeter = cv2.arcLength(largest_contour, True)
+            # Extract shape features from the contour enclosing the most area
+            if len(ctx.contours):
+                largest = int(np.argmax(ctx.contour_areas))
+                area = float(ctx.contour_areas[largest])
+                perimeter = cv2.arcLength(ctx.contours[largest], True)
                 circularity = 4 * np.pi * area / (perimeter * perimeter + 1e-6)
             else:
                 area, perimeter, circularity = 0, 0, 0
             
-            # Combine all features
-            features = np.concatenate([
-                lbp_hist,  # 10 features
-                [edge_density, mean_intensity, std_intensity, skewness, kurtosis],  # 5 features
-                [area / (gray.shape[0] * gray.shape[1]), perimeter / (2 * (gray.shape[0] + gray.shape[1])), circularity],  # 3 features
-                [np.percentile(gray, p) for p in [25, 50, 75, 90]]  # 4 features
-            ])
-            
-            # Pad or truncate to ensure exactly 20 features
-            if len(features) < 20:
-                features = np.pad(features, (0, 20 - len(features)), 'constant')
-            else:
-                features = features[:20]
+            # Write all features into a single vector; only the 25th and 50th
+            # percentiles fit in the 20 slots, the 75th/90th were always truncated
+            features = np.empty(N_FEATURES, dtype=FEATURE_DTYPE)
+            features[:10] = lbp_hist / (lbp_hist.sum() + 1e-6)  # 10 features
+            features[10:15] = edge_density, mean_intensity, std_intensity, skewness, kurtosis  # 5 features
+            features[15:18] = (area / (gray.shape[0] * gray.shape[1]),
+                               perimeter / (2 * (gray.shape[0] + gray.shape[1])),
+                               circularity)  # 3 features
+            features[18:20] = _percentiles_from_histogram(gray, [25, 50])  # 2 features
             
             return features
             
         except Exception as e:
             print(f"Feature extraction error: {e}")
             # Return default features if extraction fails
-            return np.zeros(20)
+            return np.zeros(N_FEATURES, dtype=FEATURE_DTYPE)
     
-    def _calculate_skewness(self, image):
-        """Calculate skewness of image intensity distribution"""
-        flat = image.flatten()
-        mean_val = np.mean(flat)
-        std_val = np.std(flat)
-        if std_val == 0:
-            return 0
-        return np.mean(((flat - mean_val) / std_val) ** 3)
+    def _prepare_image(self, image):
+        """Resize an image and extract its features; return (ctx, features, scale)"""
+        # Downsample large uploads once so every stage below runs at analysis size
+        original_width = image.shape[1]
+        image = resize_image_for_analysis(image, max_size=ANALYSIS_MAX_SIZE)
+        scale = image.shape[1] / original_width
+        
+        # Grayscale, blur and edge detection run once and are shared below
+        ctx = self._build_image_ctx(image)
+        
+        # Extract features
+        features = self.extract_features(image, ctx)
+        
+        return ctx, features, scale
     
-    def _calculate_kurtosis(self, image):
-        """Calculate kurtosis of image intensity distribution"""
-        flat = image.flatten()
-        mean_val = np.mean(flat)
-        std_val = np.std(flat)
-        if std_val == 0:
-            return 0
-        return np.mean(((flat - mean_val) / std_val) ** 4) - 3
+    def _scale_features(self, features):
+        """Standardize a (n_samples, n_features) matrix with the training statistics"""
+        return (features - self._mean) * self._inv_scale
+    
+    def _build_result(self, ctx, features, scale, cancer_probability, processing_time):
+        """Turn a cancer probability into the result dictionary shown to users"""
+        prediction = 1 if cancer_probability > 0.5 else 0
+        confidence = max(cancer_probability, 1.0 - cancer_probability)
+        
+        # Get detailed analysis
+        detailed_results = self._get_detailed_analysis(ctx, features, prediction, confidence, scale)
+        
+        return {
+            'prediction': 'Cancer Detected' if prediction == 1 else 'Normal',
+            'confidence': float(confidence),
+            'risk_level': self._get_risk_level(confidence, prediction),
+            'detailed_results': detailed_results,
+            'processing_time': processing_time
+        }
+    
+    def _failed_result(self, error, processing_time):
+        """Result dictionary for an image that could not be analysed"""
+        return {
+            'prediction': 'Analysis Failed',
+            'confidence': 0.0,
+            'risk_level': 'Unknown',
+            'detailed_results': {'error': str(error)},
+            'processing_time': processing_time
+        }
     
     def predict(self, image):
         """Predict lung cancer from medical image"""
         start_time = time.time()
         
         try:
-            # Extract features
-            features = self.extract_features(image)
-            
-            # Reshape for prediction
-            features = features.reshape(1, -1)
-            
-            # Scale features
-            features_scaled = self.scaler.transform(features)
+            ctx, features, scale = self._prepare_image(image)
             
-            # Make prediction
-            prediction = self.model.predict(features_scaled)[0]
-            confidence = self.model.predict_proba(features_scaled)[0].max()
-            
-            # Get detailed analysis
-            detailed_results = self._get_detailed_analysis(image, features[0], prediction, confidence)
-            
-            processing_time = time.time() - start_time
-            
-            result = {
-                'prediction': 'Cancer Detected' if prediction == 1 else 'Normal',
-                'confidence': float(confidence),
-                'risk_level': self._get_risk_level(confidence, prediction),
-                'detailed_results': detailed_results,
-                'processing_time': processing_time
-            }
+            # Scale features and make prediction
+            features_scaled = self._scale_features(features.reshape(1, -1))
+            cancer_probability = float(self._booster.predict(features_scaled)[0])
             
-            return result
+            return self._build_result(ctx, features, scale, cancer_probability, time.time() - start_time)
             
         except Exception as e:
             print(f"Prediction error: {e}")
-            return {
-                'prediction': 'Analysis Failed',
-                'confidence': 0.0,
-                'risk_level': 'Unknown',
-                'detailed_results': {'error': str(e)},
-                'processing_time': time.time() - start_time
-            }
+            return self._failed_result(e, time.time() - start_time)
+    
+    def predict_batch(self, images):
+        """Predict several images, extracting features in parallel and scoring them in one call"""
+        start_time = time.time()
+        
+        def prepare(image):
+            try:
+                return self._prepare_image(image)
+            except Exception as e:
+                print(f"Prediction error: {e}")
+                return e
+        
+        # OpenCV and the Numba kernels release the GIL, so threads overlap
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            prepared = list(executor.map(prepare, images))
+        
+        ok = [p for p in prepared if not isinstance(p, Exception)]
+        try:
+            if ok:
+                features = np.vstack([features for _, features, _ in ok])
+                probabilities = iter(self._booster.predict(self._scale_features(features)))
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            elapsed = time.time() - start_time
+            return [self._failed_result(e, elapsed) for _ in prepared]
+        
+        # The batch is timed as a whole, so each image reports its share
+        processing_time = (time.time() - start_time) / max(len(prepared), 1)
+        results = []
+        for p in prepared:
+            if isinstance(p, Exception):
+                results.append(self._failed_result(p, processing_time))
+            else:
+                ctx, features, scale = p
+                results.append(self._build_result(ctx, features, scale, float(next(probabilities)),
+                                                  processing_time))
+        
+        return results
     
     def _get_risk_level(self, confidence, prediction):
         """Determine risk level based on prediction and confidence"""
@@ -208,26 +432,16 @@ class LungCancerDetector:
             else:
                 return 'Uncertain - Additional Imaging Required'
     
-    def _get_detailed_analysis(self, image, features, prediction, confidence):
+    def _get_detailed_analysis(self, ctx, features, prediction, confidence, scale=1.0):
         """Generate detailed analysis results"""
         try:
-            # Convert to grayscale if needed
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-            else:
-                gray = image
-            
             # Analyze image characteristics
-            mean_intensity = np.mean(gray)
-            std_intensity = np.std(gray)
+            mean_intensity, std_intensity = ctx.mean, ctx.std
             
-            # Detect potential regions of interest
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            edges = feature.canny(blurred, sigma=1)
-            
-            # Count potential nodules (simplified approach)
-            contours, _ = cv2.findContours(edges.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            potential_nodules = len([c for c in contours if cv2.contourArea(c) > 50])
+            # Count potential nodules (simplified approach), with the minimum
+            # area expressed in pixels of the analysed image
+            min_area = NODULE_MIN_AREA * scale * scale
+            potential_nodules = int(np.count_nonzero(ctx.contour_areas > min_area))
             
             detailed_results = {
                 'image_quality': 'Good' if std_intensity > 30 else 'Poor',
@@ -271,3 +485,7 @@ lung_cancer_detector = LungCancerDetector()
 def analyze_lung_image(image):
     """Main function to analyze lung image"""
     return lung_cancer_detector.predict(image)
+
+def get_risk_level(prediction, confidence):
+    """Risk level for a stored prediction label and confidence"""
+    return lung_cancer_detector._get_risk_level(confidence, 1 if prediction == 'Cancer Detected' else 0)
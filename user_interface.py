@@ -1,20 +1,31 @@
 import streamlit as st
 import numpy as np
-import cv2
-from PIL import Image
-import io
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
-from datetime import datetime
 
 from image_processor import (
     process_uploaded_image, preprocess_medical_image, 
     enhance_image_for_display, create_annotated_image,
-    validate_medical_image, resize_image_for_analysis
+    validate_medical_image, resize_image_for_analysis, to_grayscale
 )
-from ml_model import analyze_lung_image
-from database import store_image, store_analysis_result, get_user_images
+from ml_model import analyze_lung_image, get_risk_level
+from database import store_image, store_analysis_result, get_user_images, find_analyzed_image_by_hash
+from utils import calculate_file_hash
+from database_cached import invalidate_admin_cache
+
+# A user's own history is cached briefly and cleared whenever they upload
+USER_RESULTS_CACHE_TTL = 60
+USER_RESULT_COLUMNS = [
+    'Image ID', 'Filename', 'Upload Date', 'Image Type', 'File Size',
+    'Prediction', 'Confidence Score', 'Analysis Date'
+]
+# Rows of the results table sent to the browser per page
+RESULTS_PAGE_SIZE = 50
+# "Sort by" option -> (column, ascending)
+RESULT_SORT_KEYS = {
+    "Upload Date": ("Upload Date", False),
+    "Confidence Score": ("Confidence Score", False),
+    "Prediction": ("Prediction", True),
+}
 
 def show_user_interface():
     """Display user interface for medical image analysis"""
@@ -68,8 +79,12 @@ def show_image_upload_interface():
                 else:
                     st.write("- **File information not available**")
             
+            # The grayscale copy is shared by validation and preprocessing,
+            # which both run in the rerun triggered by the Analyze button
+            gray_image = to_grayscale(image_array)
+            
             # Validate image
-            validation_result = validate_medical_image(image_array, file_info)
+            validation_result = validate_medical_image(image_array, file_info, gray_image)
             
             # Show validation results
             if validation_result['warnings']:
@@ -87,53 +102,70 @@ def show_image_upload_interface():
                     analyze_button = st.button("🔍 Analyze Image", type="primary", use_container_width=True)
                 
                 if analyze_button:
-                    analyze_and_display_results(image_array, image_data, file_info)
+                    analyze_and_display_results(image_array, image_data, file_info, gray_image)
             else:
                 st.error("Cannot analyze image due to validation errors. Please upload a different image.")
         else:
             st.error("Failed to process the uploaded image. Please try a different file.")
 
-def analyze_and_display_results(image_array, image_data, file_info):
+def analyze_and_display_results(image_array, image_data, file_info, gray_image=None):
     """Analyze image and display results"""
+    # A re-upload of a file this user already analysed reuses the stored result
+    file_hash = calculate_file_hash(image_data)
+    previous = find_analyzed_image_by_hash(st.session_state.user_id, file_hash)
+    if previous:
+        _, prediction, confidence, detailed_results, processing_time = previous
+        analysis_result = {
+            'prediction': prediction,
+            'confidence': confidence,
+            'risk_level': get_risk_level(prediction, confidence),
+            'detailed_results': detailed_results or {},
+            'processing_time': processing_time or 0.0
+        }
+        st.info("This image was analyzed before - showing the stored result.")
+        display_analysis_results(
+            image_array, analysis_result,
+            enhance_image_for_display(image_array),
+            create_annotated_image(image_array, analysis_result)
+        )
+        return
+    
     # Store the original image first
     image_id = store_image(
         st.session_state.user_id,
         file_info['filename'],
         image_data,
         file_info.get('format', 'Unknown'),
-        file_info['size']
+        file_info['size'],
+        file_hash
     )
     
     if not image_id:
         st.error("Failed to store image. Please try again.")
         return
     
-    # Show progress
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    invalidate_admin_cache()
+    _clear_user_results_cache()
+    
+    # One status element carries every phase, so each step is a single update
+    status = st.status("Preprocessing image...")
     
     try:
         # Preprocess image
-        status_text.text("Preprocessing image...")
-        progress_bar.progress(25)
-        
-        preprocessed_image = preprocess_medical_image(image_array)
+        preprocessed_image = preprocess_medical_image(image_array, gray_image)
         
         # Resize for analysis
-        status_text.text("Preparing for analysis...")
-        progress_bar.progress(50)
+        status.update(label="Preparing for analysis...")
         
         analysis_image = resize_image_for_analysis(preprocessed_image)
         
         # Perform ML analysis
-        status_text.text("Analyzing with AI model...")
-        progress_bar.progress(75)
+        status.update(label="Analyzing with AI model...")
         
         analysis_result = analyze_lung_image(analysis_image)
         
         # Store analysis result
-        status_text.text("Storing results...")
-        progress_bar.progress(90)
+        status.update(label="Storing results...")
         
         result_id = store_analysis_result(
             image_id,
@@ -144,24 +176,32 @@ def analyze_and_display_results(image_array, image_data, file_info):
             analysis_result['processing_time']
         )
         
-        progress_bar.progress(100)
-        status_text.text("Analysis complete!")
-        
         if result_id:
+            invalidate_admin_cache()
+            _clear_user_results_cache()
+            
+            # Prepare display images while the status is still running
+            status.update(label="Preparing visualizations...")
+            
+            enhanced_image = enhance_image_for_display(image_array)
+            annotated_image = create_annotated_image(image_array, analysis_result)
+            
+            status.update(label="Analysis complete!", state="complete")
+            
             # Display results
-            display_analysis_results(image_array, analysis_result)
+            display_analysis_results(image_array, analysis_result, enhanced_image, annotated_image)
         else:
+            status.update(label="Storing results failed", state="error")
             st.error("Failed to store analysis results.")
             
     except Exception as e:
+        status.update(label="Analysis failed", state="error")
         st.error(f"Analysis failed: {str(e)}")
-    finally:
-        # Clear progress indicators
-        progress_bar.empty()
-        status_text.empty()
 
-def display_analysis_results(image_array, analysis_result):
+def display_analysis_results(image_array, analysis_result, enhanced_image, annotated_image):
     """Display comprehensive analysis results"""
+    import plotly.graph_objects as go
+    
     st.success("✅ Analysis Complete!")
     
     # Main results
@@ -259,12 +299,10 @@ def display_analysis_results(image_array, analysis_result):
     
     with col2:
         st.write("**Enhanced Image**")
-        enhanced_image = enhance_image_for_display(image_array)
         st.image(enhanced_image, use_column_width=True)
     
     # Annotated image
     st.write("**Annotated Analysis**")
-    annotated_image = create_annotated_image(image_array, analysis_result)
     st.image(annotated_image, use_column_width=True)
     
     # Recommendations
@@ -293,62 +331,84 @@ def display_analysis_results(image_array, analysis_result):
     This AI-powered analysis is for informational purposes only and should not be considered as a substitute for professional medical advice, diagnosis, or treatment. Always seek the advice of your physician or other qualified health provider with any questions you may have regarding a medical condition.
     """)
 
+@st.cache_data(ttl=USER_RESULTS_CACHE_TTL, show_spinner=False)
+def _load_user_images_df(user_id):
+    """Fetch a user's images as a typed DataFrame"""
+    df = pd.DataFrame.from_records(get_user_images(user_id), columns=USER_RESULT_COLUMNS)
+    df['Upload Date'] = pd.to_datetime(df['Upload Date'])
+    # Day bucket for the upload timeline, kept out of the results table
+    df['_upload_day'] = df['Upload Date'].dt.normalize()
+    df['Analysis Date'] = pd.to_datetime(df['Analysis Date'])
+    # Narrow numeric columns; float32 keeps far more precision than is displayed
+    df['Confidence Score'] = pd.to_numeric(df['Confidence Score'], errors='coerce').astype('float32')
+    df['File Size'] = pd.to_numeric(df['File Size'], downcast='integer')
+    return df
+
+@st.cache_data(ttl=USER_RESULTS_CACHE_TTL, show_spinner=False)
+def _upload_timeline(user_id):
+    """Per-day upload counts for a user's timeline chart"""
+    df = _load_user_images_df(user_id)
+    timeline_data = df.groupby('_upload_day', sort=True).size().rename('Count').reset_index()
+    return timeline_data.rename(columns={'_upload_day': 'Upload Date'})
+
+@st.cache_data(ttl=USER_RESULTS_CACHE_TTL, show_spinner=False)
+def _prediction_counts(user_id):
+    """Prediction label counts for a user's distribution chart"""
+    return _load_user_images_df(user_id)['Prediction'].value_counts()
+
+def _clear_user_results_cache():
+    """Drop cached history data after the user's images change"""
+    _load_user_images_df.clear()
+    _upload_timeline.clear()
+    _prediction_counts.clear()
+
 def show_user_results():
     """Show user's previous analysis results"""
+    import plotly.express as px
+    
     st.subheader("📊 My Analysis History")
     
-    user_images = get_user_images(st.session_state.user_id)
+    df = _load_user_images_df(st.session_state.user_id)
     
-    if user_images:
-        # Convert to DataFrame for easier handling
-        df = pd.DataFrame(user_images)
-        if not df.empty:
-            df.columns = [
-                'Image ID', 'Filename', 'Upload Date', 'Image Type', 'File Size',
-                'Prediction', 'Confidence Score', 'Analysis Date'
-            ]
+    if not df.empty:
+        # Summary statistics from plain NumPy masks
+        predictions = df['Prediction'].to_numpy(dtype=object)
+        analyzed_mask = pd.notna(predictions)
+        analyzed_count = int(analyzed_mask.sum())
+        cancer_detected = int((predictions[analyzed_mask] == 'Cancer Detected').sum())
+        confidences = df['Confidence Score'].to_numpy(dtype='float64')
+        confidences = confidences[~np.isnan(confidences)]
+        avg_confidence = confidences.mean() if len(confidences) > 0 else 0
         
-        # Summary statistics
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             st.metric("Total Images", len(df))
         
         with col2:
-            analyzed_count = len(df[df['Prediction'].notna()])
             st.metric("Analyzed Images", analyzed_count)
         
         with col3:
-            if analyzed_count > 0:
-                cancer_detected = len(df[df['Prediction'].notna() & df['Prediction'].str.contains('Cancer', na=False)])
-                st.metric("Cancer Detected", cancer_detected)
-            else:
-                st.metric("Cancer Detected", 0)
+            st.metric("Cancer Detected", cancer_detected)
         
         with col4:
-            avg_confidence = df['Confidence Score'].mean() if not df.empty and len(df[df['Confidence Score'].notna()]) > 0 else 0
             st.metric("Avg Confidence", f"{avg_confidence:.1%}")
         
         # Results timeline
-        if not df.empty and 'Upload Date' in df.columns and len(df[df['Upload Date'].notna()]) > 0:
-            st.subheader("📈 Upload Timeline")
-            
-            # Prepare data for timeline
-            df['Upload Date'] = pd.to_datetime(df['Upload Date'])
-            timeline_data = df.groupby(df['Upload Date'].dt.date).size().reset_index().rename(columns={0: 'Count'})
-            
-            fig_timeline = px.line(timeline_data, x='Upload Date', y='Count', 
-                                 title="Image Uploads Over Time")
-            st.plotly_chart(fig_timeline, use_container_width=True)
+        if df['Upload Date'].notna().any():
+            with st.expander("📈 Upload Timeline", expanded=False):
+                timeline_data = _upload_timeline(st.session_state.user_id)
+                fig_timeline = px.line(timeline_data, x='Upload Date', y='Count', 
+                                     title="Image Uploads Over Time")
+                st.plotly_chart(fig_timeline, use_container_width=True)
         
         # Prediction distribution
-        if not df.empty and len(df[df['Prediction'].notna()]) > 0:
-            st.subheader("📊 Analysis Results Distribution")
-            
-            prediction_counts = df['Prediction'].value_counts()
-            fig_pie = px.pie(values=prediction_counts.values, names=prediction_counts.index,
-                           title="Prediction Results")
-            st.plotly_chart(fig_pie, use_container_width=True)
+        if analyzed_count > 0:
+            with st.expander("📊 Analysis Results Distribution", expanded=False):
+                prediction_counts = _prediction_counts(st.session_state.user_id)
+                fig_pie = px.pie(values=prediction_counts.values, names=prediction_counts.index,
+                               title="Prediction Results")
+                st.plotly_chart(fig_pie, use_container_width=True)
         
         # Detailed results table
         st.subheader("📋 Detailed Results")
@@ -358,27 +418,157 @@ def show_user_results():
         with col1:
             show_all = st.checkbox("Show all columns", value=False)
         with col2:
-            sort_by = st.selectbox("Sort by", ["Upload Date", "Confidence Score", "Prediction"])
+            sort_by = st.selectbox("Sort by", list(RESULT_SORT_KEYS))
         
         # Prepare display DataFrame
         if show_all:
-            display_df = df
+            display_df = df.drop(columns='_upload_day')
         else:
             display_df = df[['Filename', 'Upload Date', 'Prediction', 'Confidence Score']]
         
         # Sort
-        if sort_by == "Upload Date" and len(display_df) > 0:
-            display_df = display_df.sort_values(by='Upload Date', ascending=False)
-        elif sort_by == "Confidence Score" and len(display_df) > 0:
-            display_df = display_df.sort_values(by='Confidence Score', ascending=False)
-        elif sort_by == "Prediction" and len(display_df) > 0:
-            display_df = display_df.sort_values(by='Prediction', ascending=True)
-        
-        st.dataframe(display_df, use_container_width=True)
+        sort_column, ascending = RESULT_SORT_KEYS[sort_by]
+        display_df = display_df.sort_values(by=sort_column, ascending=ascending,
+                                            kind='stable', na_position='last')
+        
+        # Only the current page of rows is sent to the browser
+        page_count = max(1, -(-len(display_df) // RESULTS_PAGE_SIZE))
+        page = 1
+        if page_count > 1:
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+            st.caption(f"Page {page} of {page_count} ({len(display_df)} images)")
+        start = (page - 1) * RESULTS_PAGE_SIZE
+        st.dataframe(display_df.iloc[start:start + RESULTS_PAGE_SIZE], use_container_width=True)
         
     else:
         st.info("No images uploaded yet. Use the 'Upload & Analyze' tab to get started!")
 
+# Static educational content for the Medical Information tab, kept at module
+# level so it is built once rather than on every rerun
+ABOUT_LUNG_CANCER_MD = """
+## About Lung Cancer
+
+Lung cancer is one of the most common and serious types of cancer. It occurs when cells in the lungs grow and multiply uncontrollably, forming tumors.
+
+### Types of Lung Cancer:
+- **Non-Small Cell Lung Cancer (NSCLC)**: About 85% of lung cancers
+- **Small Cell Lung Cancer (SCLC)**: About 15% of lung cancers
+
+### Risk Factors:
+- **Smoking**: The leading cause (85-90% of cases)
+- **Secondhand smoke**: Increases risk by 20-30%
+- **Radon exposure**: Second leading cause
+- **Asbestos exposure**: Particularly dangerous when combined with smoking
+- **Family history**: Genetic predisposition
+- **Air pollution**: Long-term exposure
+- **Previous radiation therapy**: To the chest area
+
+### Symptoms to Watch For:
+- Persistent cough that doesn't go away
+- Coughing up blood or rust-colored sputum
+- Chest pain that worsens with breathing or coughing
+- Shortness of breath
+- Unexplained weight loss
+- Fatigue
+- Hoarseness
+- Recurring respiratory infections
+"""
+
+SCREENING_GUIDELINES_MD = """
+## Screening Guidelines
+
+Early detection of lung cancer can significantly improve treatment outcomes and survival rates.
+
+### Who Should Be Screened:
+The U.S. Preventive Services Task Force (USPSTF) recommends annual lung cancer screening for people who:
+- Are 50-80 years old
+- Have a 20 pack-year smoking history (pack-year = packs per day × years smoked)
+- Currently smoke or have quit within the past 15 years
+- Are in good health and able to undergo treatment if cancer is found
+
+### Screening Methods:
+- **Low-Dose CT (LDCT)**: The gold standard for lung cancer screening
+- **Chest X-rays**: Less sensitive but still useful for initial assessment
+- **Sputum cytology**: Analysis of coughed-up phlegm
+
+### AI-Assisted Screening:
+- Our system uses machine learning to analyze medical images
+- Provides preliminary assessment and confidence scores
+- Helps identify areas that may need closer examination
+- **Important**: AI screening is supplementary to, not a replacement for, professional medical evaluation
+"""
+
+UNDERSTANDING_RESULTS_MD = """
+## Understanding Your Results
+
+### Prediction Types:
+- **Normal**: No obvious signs of malignancy detected
+- **Cancer Detected**: Suspicious patterns identified that may indicate cancer
+
+### Confidence Scores:
+- **90-100%**: Very high confidence in the prediction
+- **70-89%**: High confidence, reliable result
+- **50-69%**: Moderate confidence, may need additional testing
+- **Below 50%**: Low confidence, results uncertain
+
+### Risk Levels:
+- **Very Low Risk**: Normal findings with high confidence
+- **Low Risk**: Normal findings with moderate confidence
+- **Moderate Risk**: Some concerning features detected
+- **High Risk**: Strong indicators of potential malignancy
+- **Uncertain**: Requires additional imaging or testing
+
+### What Affects Analysis Quality:
+- **Image quality**: Clear, high-resolution images provide better results
+- **Patient positioning**: Proper positioning improves accuracy
+- **Image type**: CT scans generally provide more detail than X-rays
+- **Technical factors**: Proper exposure and contrast settings
+
+### Limitations:
+- AI analysis is a screening tool, not a diagnostic tool
+- Small or early-stage cancers may not be detected
+- False positives and false negatives can occur
+- Cannot replace radiologist interpretation
+"""
+
+WHEN_TO_SEEK_HELP_MD = """
+## When to Seek Immediate Medical Help
+
+### Urgent Symptoms (Seek immediate care):
+- **Severe chest pain**: Especially if sudden or worsening
+- **Difficulty breathing**: Shortness of breath at rest
+- **Coughing up blood**: Any amount of blood in sputum
+- **Severe, persistent cough**: Especially if new or changing
+- **Unexplained weight loss**: 10+ pounds without trying
+- **Severe fatigue**: That interferes with daily activities
+
+### Follow-up Required If:
+- AI analysis shows "Cancer Detected"
+- Confidence score is high (>70%) for abnormal findings
+- You have persistent symptoms lasting more than 2-3 weeks
+- You have risk factors and concerning symptoms
+
+### Questions to Ask Your Doctor:
+1. "What do my scan results mean?"
+2. "Do I need additional testing?"
+3. "What are my risk factors?"
+4. "How often should I be screened?"
+5. "What symptoms should I watch for?"
+6. "Are there lifestyle changes I should make?"
+
+### Emergency Contacts:
+- **Emergency**: Call 911 for severe breathing problems
+- **Primary Care**: For non-emergency follow-up
+- **Oncology**: If cancer is suspected or confirmed
+- **Pulmonology**: For lung-specific concerns
+
+### Resources:
+- American Lung Association: lung.org
+- National Cancer Institute: cancer.gov
+- American Cancer Society: cancer.org
+- Lung Cancer Research Foundation: lcrf.org
+"""
+
 def show_medical_information():
     """Show medical information and educational content"""
     st.subheader("🩺 Medical Information & Education")
@@ -392,132 +582,16 @@ def show_medical_information():
     ])
     
     with edu_tab1:
-        st.markdown("""
-        ## About Lung Cancer
-        
-        Lung cancer is one of the most common and serious types of cancer. It occurs when cells in the lungs grow and multiply uncontrollably, forming tumors.
-        
-        ### Types of Lung Cancer:
-        - **Non-Small Cell Lung Cancer (NSCLC)**: About 85% of lung cancers
-        - **Small Cell Lung Cancer (SCLC)**: About 15% of lung cancers
-        
-        ### Risk Factors:
-        - **Smoking**: The leading cause (85-90% of cases)
-        - **Secondhand smoke**: Increases risk by 20-30%
-        - **Radon exposure**: Second leading cause
-        - **Asbestos exposure**: Particularly dangerous when combined with smoking
-        - **Family history**: Genetic predisposition
-        - **Air pollution**: Long-term exposure
-        - **Previous radiation therapy**: To the chest area
-        
-        ### Symptoms to Watch For:
-        - Persistent cough that doesn't go away
-        - Coughing up blood or rust-colored sputum
-        - Chest pain that worsens with breathing or coughing
-        - Shortness of breath
-        - Unexplained weight loss
-        - Fatigue
-        - Hoarseness
-        - Recurring respiratory infections
-        """)
+        st.markdown(ABOUT_LUNG_CANCER_MD)
     
     with edu_tab2:
-        st.markdown("""
-        ## Screening Guidelines
-        
-        Early detection of lung cancer can significantly improve treatment outcomes and survival rates.
-        
-        ### Who Should Be Screened:
-        The U.S. Preventive Services Task Force (USPSTF) recommends annual lung cancer screening for people who:
-        - Are 50-80 years old
-        - Have a 20 pack-year smoking history (pack-year = packs per day × years smoked)
-        - Currently smoke or have quit within the past 15 years
-        - Are in good health and able to undergo treatment if cancer is found
-        
-        ### Screening Methods:
-        - **Low-Dose CT (LDCT)**: The gold standard for lung cancer screening
-        - **Chest X-rays**: Less sensitive but still useful for initial assessment
-        - **Sputum cytology**: Analysis of coughed-up phlegm
-        
-        ### AI-Assisted Screening:
-        - Our system uses machine learning to analyze medical images
-        - Provides preliminary assessment and confidence scores
-        - Helps identify areas that may need closer examination
-        - **Important**: AI screening is supplementary to, not a replacement for, professional medical evaluation
-        """)
+        st.markdown(SCREENING_GUIDELINES_MD)
     
     with edu_tab3:
-        st.markdown("""
-        ## Understanding Your Results
-        
-        ### Prediction Types:
-        - **Normal**: No obvious signs of malignancy detected
-        - **Cancer Detected**: Suspicious patterns identified that may indicate cancer
-        
-        ### Confidence Scores:
-        - **90-100%**: Very high confidence in the prediction
-        - **70-89%**: High confidence, reliable result
-        - **50-69%**: Moderate confidence, may need additional testing
-        - **Below 50%**: Low confidence, results uncertain
-        
-        ### Risk Levels:
-        - **Very Low Risk**: Normal findings with high confidence
-        - **Low Risk**: Normal findings with moderate confidence
-        - **Moderate Risk**: Some concerning features detected
-        - **High Risk**: Strong indicators of potential malignancy
-        - **Uncertain**: Requires additional imaging or testing
-        
-        ### What Affects Analysis Quality:
-        - **Image quality**: Clear, high-resolution images provide better results
-        - **Patient positioning**: Proper positioning improves accuracy
-        - **Image type**: CT scans generally provide more detail than X-rays
-        - **Technical factors**: Proper exposure and contrast settings
-        
-        ### Limitations:
-        - AI analysis is a screening tool, not a diagnostic tool
-        - Small or early-stage cancers may not be detected
-        - False positives and false negatives can occur
-        - Cannot replace radiologist interpretation
-        """)
+        st.markdown(UNDERSTANDING_RESULTS_MD)
     
     with edu_tab4:
-        st.markdown("""
-        ## When to Seek Immediate Medical Help
-        
-        ### Urgent Symptoms (Seek immediate care):
-        - **Severe chest pain**: Especially if sudden or worsening
-        - **Difficulty breathing**: Shortness of breath at rest
-        - **Coughing up blood**: Any amount of blood in sputum
-        - **Severe, persistent cough**: Especially if new or changing
-        - **Unexplained weight loss**: 10+ pounds without trying
-        - **Severe fatigue**: That interferes with daily activities
-        
-        ### Follow-up Required If:
-        - AI analysis shows "Cancer Detected"
-        - Confidence score is high (>70%) for abnormal findings
-        - You have persistent symptoms lasting more than 2-3 weeks
-        - You have risk factors and concerning symptoms
-        
-        ### Questions to Ask Your Doctor:
-        1. "What do my scan results mean?"
-        2. "Do I need additional testing?"
-        3. "What are my risk factors?"
-        4. "How often should I be screened?"
-        5. "What symptoms should I watch for?"
-        6. "Are there lifestyle changes I should make?"
-        
-        ### Emergency Contacts:
-        - **Emergency**: Call 911 for severe breathing problems
-        - **Primary Care**: For non-emergency follow-up
-        - **Oncology**: If cancer is suspected or confirmed
-        - **Pulmonology**: For lung-specific concerns
-        
-        ### Resources:
-        - American Lung Association: lung.org
-        - National Cancer Institute: cancer.gov
-        - American Cancer Society: cancer.org
-        - Lung Cancer Research Foundation: lcrf.org
-        """)
+        st.markdown(WHEN_TO_SEEK_HELP_MD)
     
     # Disclaimer
     st.error("""
@@ -1,4 +1,7 @@
 import os
+import re
+import math
+import secrets
 import hashlib
 import base64
 import json
@@ -8,30 +11,66 @@ import cv2
 from PIL import Image
 import io
 import logging
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _RootHandlersForwarder(logging.Handler):
+    """Pass records on to the root logger's handlers as configured when each record is written"""
+    
+    def emit(self, record):
+        for handler in logging.getLogger().handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+# Records from this module are queued and written by a background thread,
+# so callers never block on the handlers' I/O. The thread forwards them to
+# the root handlers in place of normal propagation, so handlers configured
+# after this module is imported still receive them
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _RootHandlersForwarder())
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+_VALID_IMAGE_EXTS = frozenset({'png', 'jpg', 'jpeg', 'tiff', 'bmp', 'gif'})
+
+# Keys masked by mask_sensitive_data by default
+SENSITIVE_FIELDS = frozenset({'password', 'password_hash', 'api_key', 'secret'})
+
+# Validation patterns, compiled once at import
+_SANITIZE_RE = re.compile(r'[<>:"/\\|?*]')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Username should be 3-50 characters, alphanumeric and underscore only
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]{3,50}$')
+
 def generate_session_token():
     """Generate a secure session token"""
-    return hashlib.sha256(os.urandom(32)).hexdigest()
+    return secrets.token_hex(32)
 
 def validate_image_format(uploaded_file):
     """Validate if uploaded file is a valid image format"""
-    valid_formats = ['png', 'jpg', 'jpeg', 'tiff', 'bmp', 'gif']
-    
     if uploaded_file.name:
-        file_extension = uploaded_file.name.lower().split('.')[-1]
-        return file_extension in valid_formats
+        # Lowercase just the text after the last dot rather than the whole name
+        file_extension = uploaded_file.name.rpartition('.')[2].lower()
+        return file_extension in _VALID_IMAGE_EXTS
     
     return False
 
 def sanitize_filename(filename):
     """Sanitize filename to prevent security issues"""
     # Remove or replace dangerous characters
-    import re
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = _SANITIZE_RE.sub('_', filename)
     filename = filename[:255]  # Limit length
     return filename
 
@@ -45,13 +84,11 @@ def format_file_size(size_bytes):
         return "0 B"
     
     size_names = ["B", "KB", "MB", "GB"]
-    i = 0
     
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
+    # Each unit is 2**10 times the previous one, so the unit index is log2 // 10
+    i = min(int(math.log2(size_bytes)) // 10, len(size_names) - 1) if size_bytes >= 1024 else 0
     
-    return f"{size_bytes:.1f} {size_names[i]}"
+    return f"{size_bytes / (1024.0 ** i):.1f} {size_names[i]}"
 
 def validate_confidence_score(score):
     """Validate confidence score is within valid range"""
@@ -105,16 +142,11 @@ def get_relative_time(dt):
 
 def validate_email(email):
     """Validate email format"""
-    import re
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_username(username):
     """Validate username format"""
-    import re
-    # Username should be 3-50 characters, alphanumeric and underscore only
-    pattern = r'^[a-zA-Z0-9_]{3,50}$'
-    return re.match(pattern, username) is not None
+    return _USERNAME_RE.match(username) is not None
 
 def validate_password_strength(password):
     """Validate password strength"""
@@ -123,16 +155,31 @@ def validate_password_strength(password):
     if len(password) < 6:
         errors.append("Password must be at least 6 characters long")
     
-    if len(password) > 128:
-        errors.append("Password must be less than 128 characters")
+    # bcrypt rejects passwords longer than 72 bytes
+    if len(password.encode()) > 72:
+        errors.append("Password must be at most 72 bytes long")
+    
+    # Classify characters in one pass, stopping once every class has been seen
+    has_lower = has_upper = has_digit = False
+    for c in password:
+        if c.islower():
+            has_lower = True
+        elif c.isupper():
+            has_upper = True
+        elif c.isdigit():
+            has_digit = True
+        else:
+            continue
+        if has_lower and has_upper and has_digit:
+            break
     
-    if not any(c.islower() for c in password):
+    if not has_lower:
         errors.append("Password must contain at least one lowercase letter")
     
-    if not any(c.isupper() for c in password):
+    if not has_upper:
         errors.append("Password must contain at least one uppercase letter")
     
-    if not any(c.isdigit() for c in password):
+    if not has_digit:
         errors.append("Password must contain at least one number")
     
     return len(errors) == 0, errors
@@ -153,12 +200,27 @@ def log_user_activity(user_id, activity, details=None):
 def safe_json_loads(json_string, default=None):
     """Safely load JSON string with default fallback"""
     try:
+        if orjson is not None:
+            return orjson.loads(json_string)
         return json.loads(json_string)
     except (json.JSONDecodeError, TypeError):
         return default if default is not None else {}
 
 def safe_json_dumps(obj, default=None):
     """Safely dump object to JSON string"""
+    if orjson is not None:
+        try:
+            # orjson serializes numpy scalars and arrays natively; datetimes and
+            # dataclasses are passed through to default=str so they keep the
+            # json.dumps(default=str) format ("YYYY-MM-DD HH:MM:SS", not ISO "T")
+            return orjson.dumps(
+                obj, default=str,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            ).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits, which json still handles
+    
     try:
         return json.dumps(obj, default=str)
     except (TypeError, ValueError):
@@ -182,13 +244,15 @@ def create_success_response(data=None, message=None):
         'timestamp': datetime.now().isoformat()
     }
 
-def mask_sensitive_data(data, fields_to_mask=['password', 'password_hash', 'api_key', 'secret']):
-    """Mask sensitive fields in data for logging"""
+def mask_sensitive_data(data, fields_to_mask=SENSITIVE_FIELDS):
+    """Mask sensitive fields in data for logging; data without any is returned as-is"""
     if isinstance(data, dict):
-        masked = data.copy()
-        for field in fields_to_mask:
-            if field in masked:
-                masked[field] = '***MASKED***'
+        sensitive_keys = data.keys() & fields_to_mask
+        if not sensitive_keys:
+            return data
+        masked = dict(data)
+        for field in sensitive_keys:
+            masked[field] = '***MASKED***'
         return masked
     return data
 
@@ -219,11 +283,8 @@ def validate_database_connection():
     """Validate database connection is working"""
     try:
         from database import get_db_connection
-        conn = get_db_connection()
-        if conn:
-            conn.close()
-            return True
-        return False
+        with get_db_connection() as conn:
+            return conn is not None
     except Exception as e:
         logger.error(f"Database connection validation failed: {e}")
         return False
@@ -233,8 +294,27 @@ def generate_report_filename(user_id, report_type):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{report_type}_user{user_id}_{timestamp}.pdf"
 
+# Exact-type lookup for the numpy types that show up in analysis results
+_NUMPY_CONVERTERS = {
+    **{t: int for t in (np.int8, np.int16, np.int32, np.int64,
+                        np.uint8, np.uint16, np.uint32, np.uint64)},
+    np.float32: float,
+    np.float64: float,
+    np.bool_: bool,
+    np.ndarray: np.ndarray.tolist,
+}
+_NATIVE_TYPES = frozenset((str, int, float, bool, type(None), dict, list, tuple))
+
 def convert_numpy_types(obj):
     """Convert numpy types to native Python types for JSON serialization"""
+    obj_type = type(obj)
+    converter = _NUMPY_CONVERTERS.get(obj_type)
+    if converter is not None:
+        return converter(obj)
+    if obj_type in _NATIVE_TYPES:
+        return obj
+    
+    # Less common numpy scalars and subclasses
     if isinstance(obj, np.integer):
         return int(obj)
     elif isinstance(obj, np.floating):